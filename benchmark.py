@@ -0,0 +1,140 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+from crawl_pool import load_scraper_class
+from fixture_server import SyntheticSite, SyntheticSiteServer
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)), text=True).strip()
+    except Exception:
+        return 'unknown'
+
+
+def run_benchmark(listings=20, mode='http', photo_count=12, amenity_count=8, gallery_modal=True,
+                  latency=0.0, photo_bytes=200 * 1024, download=True, lean=False, verbose=False):
+    """Drive PeerspaceListingScraper end to end against a local synthetic site"""
+    site = SyntheticSite(photo_count=photo_count, amenity_count=amenity_count, gallery_modal=gallery_modal,
+                         latency=latency, photo_bytes=photo_bytes)
+    Scraper = load_scraper_class()
+
+    with SyntheticSiteServer(site) as server, tempfile.TemporaryDirectory() as workdir:
+        scraper = Scraper(headless=True, use_http=(mode == 'http'), download_photos=download,
+                          photo_store_dir=os.path.join(workdir, 'photo_store'), instrument=True,
+                          selector_cache_path=os.path.join(workdir, 'selector_cache.json'), lean=lean,
+                          browser_cache_dir=os.path.join(workdir, 'browser_cache'),
+                          page_archive_dir=os.path.join(workdir, 'page_archive'))
+
+        output = None if verbose else io.StringIO()
+        cwd = os.getcwd()
+        os.chdir(workdir)  # Venue photo folders land in the temp dir
+        failures = 0
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+                for i in range(listings):
+                    result = scraper.scrape_single_listing(server.listing_url(f"{i:024x}"))
+                    if result is None:
+                        failures += 1
+        finally:
+            elapsed = time.perf_counter() - started
+            os.chdir(cwd)
+            summary = scraper.instrumentation.summary()
+            scraper.close()
+
+    counters = summary['counters']
+    commands = counters.get('webdriver.commands', 0)
+    by_name = {name[len('webdriver.'):]: value for name, value in counters.items()
+               if name.startswith('webdriver.') and name != 'webdriver.commands'}
+
+    return {
+        'commit': git_commit(),
+        'timestamp': time.time(),
+        'machine': platform.platform(),
+        'config': {
+            'listings': listings, 'mode': mode, 'photo_count': photo_count, 'amenity_count': amenity_count,
+            'gallery_modal': gallery_modal, 'latency': latency, 'photo_bytes': photo_bytes, 'download': download,
+            'lean': lean,
+        },
+        'elapsed_s': round(elapsed, 3),
+        'listings_per_s': round(listings / elapsed, 3) if elapsed else None,
+        'failures': failures,
+        'stages': dict(sorted(summary['spans'].items())),
+        'webdriver_commands': commands,
+        'webdriver_commands_per_listing': round(commands / listings, 2),
+        'webdriver_commands_by_name': dict(sorted(by_name.items(), key=lambda item: -item[1])),
+        'http_requests': site.stats['requests'],
+        'http_bytes': site.stats['bytes'],
+        'client_counters': counters,
+    }
+
+
+def print_report(report, baseline=None):
+    def delta(key_path):
+        if not baseline:
+            return ''
+        old = baseline
+        for key in key_path:
+            old = old.get(key, {}) if isinstance(old, dict) else {}
+        new = report
+        for key in key_path:
+            new = new[key]
+        if not isinstance(old, (int, float)) or not old:
+            return ''
+        return f"  ({(new - old) / old:+.0%} vs {baseline['commit']})"
+
+    config = report['config']
+    lean = ' (lean)' if config.get('lean') else ''
+    print(f"🏁 {config['listings']} listings, mode={config['mode']}{lean}, commit {report['commit']}")
+    print(f"   {report['listings_per_s']} listings/s{delta(['listings_per_s'])}, {report['failures']} failures")
+    print(f"   WebDriver commands/listing: {report['webdriver_commands_per_listing']}"
+          f"{delta(['webdriver_commands_per_listing'])}")
+    print(f"   HTTP requests: {report['http_requests']}, bytes: {report['http_bytes']}")
+    for stage, stats in report['stages'].items():
+        print(f"   {stage:<20} p50 {stats['p50_ms']:>9.2f}ms  p90 {stats['p90_ms']:>9.2f}ms  "
+              f"p99 {stats['p99_ms']:>9.2f}ms{delta(['stages', stage, 'p50_ms'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline scraper benchmark against a local Peerspace-like site")
+    parser.add_argument('--listings', type=int, default=20)
+    parser.add_argument('--mode', choices=['http', 'browser'], default='http',
+                        help="http tries the browserless fast path, browser always uses Selenium")
+    parser.add_argument('--photos', type=int, default=12, help="photos per listing")
+    parser.add_argument('--amenities', type=int, default=8)
+    parser.add_argument('--no-modal', action='store_true', help="listings without a View all gallery")
+    parser.add_argument('--latency', type=float, default=0.0, help="artificial server latency in seconds")
+    parser.add_argument('--photo-kb', type=int, default=200)
+    parser.add_argument('--no-download', action='store_true')
+    parser.add_argument('--lean', action='store_true', help="browser mode with images, media and fonts blocked")
+    parser.add_argument('--out', default=None, help="report path (default bench_results/<commit>-<mode>.json)")
+    parser.add_argument('--compare', default=None, help="earlier report to compare against")
+    parser.add_argument('--verbose', action='store_true', help="show the scraper's own output")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        listings=args.listings, mode=args.mode, photo_count=args.photos, amenity_count=args.amenities,
+        gallery_modal=not args.no_modal, latency=args.latency, photo_bytes=args.photo_kb * 1024,
+        download=not args.no_download, lean=args.lean, verbose=args.verbose,
+    )
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    out = args.out or os.path.join('bench_results', f"{report['commit']}-{args.mode}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Saved report to {out}")
@@ -0,0 +1,57 @@
+import os
+
+# Content the scraper never reads: photos are downloaded separately from their URLs
+BLOCKED_EXTENSIONS = [
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'avif', 'bmp', 'ico',
+    'woff', 'woff2', 'ttf', 'otf', 'eot',
+    'mp4', 'webm', 'm3u8', 'mov', 'mp3',
+]
+
+TRACKER_DOMAINS = [
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googleadservices.com',
+    'facebook.net', 'connect.facebook.com', 'hotjar.com', 'segment.io', 'segment.com', 'cdn.segment.com',
+    'fullstory.com', 'mixpanel.com', 'amplitude.com', 'intercom.io', 'intercomcdn.com',
+    'clarity.ms', 'bat.bing.com', 'nr-data.net', 'js-agent.newrelic.com', 'tiktok.com', 'pinterest.com',
+]
+
+# Chrome content settings: 2 = block
+LEAN_PREFS = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.managed_default_content_settings.media_stream': 2,
+    'profile.managed_default_content_settings.notifications': 2,
+    'profile.managed_default_content_settings.geolocation': 2,
+}
+
+DISK_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def blocked_url_patterns(extensions=BLOCKED_EXTENSIONS, domains=TRACKER_DOMAINS):
+    """Network.setBlockedURLs patterns for heavy file types and tracker hosts"""
+    patterns = []
+    for extension in extensions:
+        patterns += [f"*.{extension}", f"*.{extension}?*"]
+    for domain in domains:
+        patterns.append(f"*://*.{domain}/*")
+        patterns.append(f"*://{domain}/*")
+    return patterns
+
+
+def apply_lean_options(chrome_options, cache_dir=None):
+    """Eager page loads, image/media blocking prefs and a reusable disk cache"""
+    chrome_options.page_load_strategy = 'eager'  # DOMContentLoaded, don't wait for subresources
+    chrome_options.add_experimental_option('prefs', LEAN_PREFS)
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_options.add_argument("--mute-audio")
+    chrome_options.add_argument("--disable-background-networking")
+    if cache_dir:
+        # Survives driver restarts, unlike the throwaway profile each Chrome starts with
+        os.makedirs(cache_dir, exist_ok=True)
+        chrome_options.add_argument(f"--disk-cache-dir={os.path.abspath(cache_dir)}")
+        chrome_options.add_argument(f"--disk-cache-size={DISK_CACHE_BYTES}")
+    return chrome_options
+
+
+def apply_lean_blocking(driver, patterns=None):
+    """Block fonts, media, images and trackers through the DevTools network domain"""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns or blocked_url_patterns()})
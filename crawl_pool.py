@@ -0,0 +1,350 @@
+import argparse
+import collections
+import importlib.util
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+from discovery import ListingDiscovery
+from listing_parser import listing_id_from_url
+from listing_store import ListingStore
+from photo_downloader import HostRateLimiter
+from recrawl_scheduler import RecrawlScheduler
+from snapshot_columns import SnapshotWriter
+
+SCRAPER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'manual url link test v2.py')
+
+
+def load_scraper_class():
+    """Import PeerspaceListingScraper from the main script (its filename has spaces)"""
+    module = sys.modules.get('peerspace_scraper')
+    if module is None:
+        spec = importlib.util.spec_from_file_location('peerspace_scraper', SCRAPER_SCRIPT)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['peerspace_scraper'] = module
+        spec.loader.exec_module(module)
+    return module.PeerspaceListingScraper
+
+
+def browser_scraper_kwargs(scraper_kwargs, name):
+    """Scraper kwargs for one of several live browsers: lean ones each get their own disk cache"""
+    base = scraper_kwargs.get('browser_cache_dir', 'browser_cache')
+    if scraper_kwargs.get('lean') and base:
+        # Chrome can't share one disk cache between live browsers
+        return dict(scraper_kwargs, browser_cache_dir=os.path.join(base, name))
+    return scraper_kwargs
+
+
+def scrape_with_restart(scraper, url, restart):
+    """(data, error, restarted) for one listing
+
+    A browser that crashed mid-listing is replaced with restart() and the
+    listing tried once more.
+    """
+    error = None
+    try:
+        data = scraper.scrape_single_listing(url)
+    except Exception as e:
+        data, error = None, str(e)
+
+    restarted = data is None and scraper.driver is not None and not scraper.driver_alive()
+    if restarted:
+        restart()
+        try:
+            data = scraper.scrape_single_listing(url)
+        except Exception as e:
+            data, error = None, str(e)
+    return data, ((error or 'no data') if data is None else None), restarted
+
+
+def crawl_worker(worker_id, tasks, result_queue, scraper_kwargs, max_pages):
+    """Worker process: one long-lived scraper/driver reused across many listings
+
+    URLs arrive one at a time on this worker's own task queue; each result
+    (and the first 'ready') asks the parent for the next one, None means stop.
+    """
+    Scraper = load_scraper_class()
+    scraper = Scraper(**browser_scraper_kwargs(scraper_kwargs, f"worker-{worker_id}"))
+    pages = 0
+
+    try:
+        result_queue.put(('ready', worker_id, None))
+        while True:
+            url = tasks.get()
+            if url is None:
+                break  # Every fed URL has been handed out, nothing more is coming
+
+            # Recycle the browser every max_pages listings to keep memory in check
+            if pages >= max_pages:
+                scraper.quit_driver()
+                pages = 0
+
+            started = time.perf_counter()
+            # A dead browser is quit; the retry starts a fresh one
+            data, error, restarted = scrape_with_restart(scraper, url, scraper.quit_driver)
+            if restarted:
+                print(f"💥 Worker {worker_id} browser died, restarted")
+                pages = 0
+
+            if scraper.driver is not None:
+                pages += 1
+            result_queue.put(('result', worker_id, {
+                'url': url,
+                'worker': worker_id,
+                'seconds': round(time.perf_counter() - started, 3),
+                'data': data,
+                'error': error,
+            }))
+    finally:
+        scraper.close()
+        result_queue.put(('done', worker_id, None))
+
+
+class CrawlPool:
+    """Spread listing URLs across a pool of worker processes with warm browsers
+
+    The parent hands each URL to one idle worker and notes it as in flight
+    before sending it, so a worker that dies at any point can only take the
+    URL it was given down with it, and that one is reported as failed.
+    """
+
+    def __init__(self, workers=None, max_pages_per_driver=50, per_host_rate=1.0, per_host_burst=2,
+                 listing_filter=None, **scraper_kwargs):
+        self.workers = workers or os.cpu_count() or 2
+        self.max_pages_per_driver = max_pages_per_driver
+        self.limiter = HostRateLimiter(per_host_rate, per_host_burst)
+        self.listing_filter = listing_filter  # Callable deciding which listings are worth fetching at all
+        self.scraper_kwargs = dict({'headless': True}, **scraper_kwargs)
+
+        ctx = mp.get_context()
+        self.ctx = ctx
+        self.result_queue = ctx.Queue()  # Worker messages, plus the URLs the feeder thread found
+        self.slots = threading.Semaphore(self.workers * 2)  # How far the feeder may run ahead
+        self.processes = {}
+        self.task_queues = {}
+        self.next_worker_id = 0
+        self.feed_error = None  # What the URL iterable raised, re-raised by crawl()
+
+    def start_worker(self):
+        worker_id = self.next_worker_id
+        self.next_worker_id += 1
+        tasks = self.ctx.Queue()
+        process = self.ctx.Process(
+            target=crawl_worker,
+            args=(worker_id, tasks, self.result_queue, self.scraper_kwargs, self.max_pages_per_driver),
+            daemon=True
+        )
+        process.start()
+        self.processes[worker_id] = process
+        self.task_queues[worker_id] = tasks
+
+    def feed(self, listings):
+        """Pass URLs to the dispatcher in crawl(), respecting the per-host rate"""
+        try:
+            for listing in listings:
+                # Items are plain URLs or dicts with a 'url' plus whatever discovery knew
+                if self.listing_filter and not self.listing_filter(listing):
+                    continue
+                url = listing['url'] if isinstance(listing, dict) else listing
+                self.slots.acquire()
+                self.limiter.acquire(url)
+                self.result_queue.put(('url', None, url))
+        except Exception as e:
+            self.feed_error = e
+        finally:
+            self.result_queue.put(('fed', None, None))  # crawl() would wait forever without it
+
+    def crawl(self, urls):
+        """Yield result dicts as listings finish; urls may be any iterable or generator"""
+        for _ in range(self.workers):
+            self.start_worker()
+
+        feeder = threading.Thread(target=self.feed, args=(urls,), daemon=True)
+        feeder.start()
+
+        backlog = collections.deque()
+        idle = collections.deque()
+        in_flight = {}
+        finished = set()
+        fed_all = False
+        while len(finished) < len(self.processes):
+            results = []
+            try:
+                kind, worker_id, payload = self.result_queue.get(timeout=1)
+            except queue.Empty:
+                results = list(self.reap_dead_workers(in_flight, idle, finished, not fed_all or bool(backlog)))
+            else:
+                if kind == 'url':
+                    backlog.append(payload)
+                elif kind == 'fed':
+                    if self.feed_error is not None:
+                        self.stop_workers()
+                        raise self.feed_error
+                    fed_all = True
+                elif kind == 'ready':
+                    idle.append(worker_id)
+                elif kind == 'result':
+                    in_flight.pop(worker_id, None)
+                    idle.append(worker_id)
+                    results.append(payload)
+                elif kind == 'done':
+                    finished.add(worker_id)
+
+            while idle and backlog:
+                worker_id = idle.popleft()
+                in_flight[worker_id] = backlog.popleft()
+                self.task_queues[worker_id].put(in_flight[worker_id])
+                self.slots.release()
+            if fed_all and not backlog:
+                while idle:
+                    self.task_queues[idle.popleft()].put(None)
+
+            yield from results
+
+        for process in self.processes.values():
+            process.join(timeout=5)
+
+    def stop_workers(self):
+        """Tell every worker to quit after its current listing"""
+        for tasks in self.task_queues.values():
+            tasks.put(None)
+        for process in self.processes.values():
+            process.join(timeout=5)
+
+    def reap_dead_workers(self, in_flight, idle, finished, work_left):
+        """Fail the URL a dead worker held and replace the worker while work is left"""
+        for worker_id, process in list(self.processes.items()):
+            if worker_id in finished or process.is_alive():
+                continue
+            finished.add(worker_id)
+            if worker_id in idle:
+                idle.remove(worker_id)
+            url = in_flight.pop(worker_id, None)
+            if url:
+                yield {'url': url, 'worker': worker_id, 'seconds': None, 'data': None,
+                       'error': f"worker exited with code {process.exitcode}"}
+            if work_left:
+                print(f"💥 Worker {worker_id} exited, starting a replacement")
+                self.start_worker()
+
+
+def crawl(urls, workers=None, **kwargs):
+    """Crawl listing URLs with a worker pool, yielding results as they complete"""
+    return CrawlPool(workers=workers, **kwargs).crawl(urls)
+
+
+def discover(discovery, sources):
+    """Chain search result and sitemap sources into one lazy listing stream"""
+    for source in sources:
+        if urlparse(source).path.endswith(('.xml', '.xml.gz')):
+            yield from discovery.sitemap(source)
+        else:
+            yield from discovery.search(source)
+
+
+def read_urls(path):
+    """Stream URLs from a file (or '-' for stdin), one per line"""
+    stream = sys.stdin if path == '-' else open(path)
+    with stream:
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl many Peerspace listings with a pool of warm browsers")
+    parser.add_argument('urls', nargs='?', default=None, help="file with one listing URL per line, or - for stdin")
+    parser.add_argument('--discover', action='append', default=[], metavar='URL',
+                        help="search results or sitemap URL to stream listings from (repeatable)")
+    parser.add_argument('--new-only', action='store_true', help="with --discover, skip listings already in --store")
+    parser.add_argument('--schedule', type=int, default=None, metavar='FETCHES_PER_DAY',
+                        help="recrawl --store listings most-likely-changed first within this daily budget "
+                             "(a URL file adds never-fetched listings)")
+    parser.add_argument('--limit', type=int, default=None, help="with --schedule, stop after this many fetches")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-pages', type=int, default=50, help="restart each browser after this many listings")
+    parser.add_argument('--rate', type=float, default=1.0, help="max listing fetches per second per host")
+    parser.add_argument('--http', action='store_true', help="try the browserless fast path first")
+    parser.add_argument('--lean', action='store_true',
+                        help="block images, media, fonts and trackers in the browser, eager page loads")
+    parser.add_argument('--radius', type=float, default=None,
+                        help="skip listings whose cached location is farther than this many miles from the target")
+    parser.add_argument('--store', default='listings.sqlite',
+                        help="listing store used to skip unchanged pages (empty to disable)")
+    parser.add_argument('--snapshots', default='snapshots',
+                        help="columnar price/capacity history directory (empty to disable)")
+    parser.add_argument('--trace', default=None,
+                        help="directory for per-worker JSON-lines stage traces (summarise with instrumentation.py)")
+    parser.add_argument('--out', default='crawl_results.jsonl')
+    args = parser.parse_args()
+    if not args.urls and not args.discover and not args.schedule:
+        parser.error("give a URL file, at least one --discover URL or --schedule")
+    if args.schedule and not args.store:
+        parser.error("--schedule needs the change history in --store")
+
+    scraper = load_scraper_class()(use_http=True, selector_cache_path=None)
+    listing_filter = None
+    if args.radius:
+        listing_filter = scraper.radius_filter(args.radius)
+        if args.store and os.path.exists(args.store):
+            # Listings located by earlier crawls can be ruled out by id, even from a plain URL file
+            store = ListingStore(args.store)
+            for _, record in store.records():
+                listing_filter.learn(record)
+            store.close()
+
+    if args.discover:
+        # Discovery pages lazily on the feeder thread, workers start on the first results
+        known_ids = ()
+        if args.new_only and args.store and os.path.exists(args.store):
+            store = ListingStore(args.store)
+            known_ids = store.known_ids()
+            store.close()
+        discovery = ListingDiscovery(scraper.setup_http_session(), known_ids=known_ids, rate=args.rate)
+        listings = discover(discovery, args.discover)
+    elif args.schedule:
+        # The scheduler paces fetches itself; the pool's per-host limiter still applies on top
+        scheduler = RecrawlScheduler(args.store, daily_budget=args.schedule, per_host_rate=args.rate)
+        if args.urls:
+            scheduler.add(read_urls(args.urls))
+        listings = scheduler.schedule(limit=args.limit or args.schedule)
+    else:
+        listings = read_urls(args.urls)
+
+    snapshots = SnapshotWriter(args.snapshots) if args.snapshots else None
+    trace_kwargs = {}
+    if args.trace:
+        trace_kwargs = {'instrument': True, 'trace_path': os.path.join(args.trace, 'trace-{pid}.jsonl')}
+
+    started = time.perf_counter()
+    count = 0
+    with open(args.out, 'a') as out:
+        for result in crawl(listings, workers=args.workers, max_pages_per_driver=args.max_pages,
+                            per_host_rate=args.rate, listing_filter=listing_filter, use_http=args.http,
+                            listing_store_path=args.store or None, lean=args.lean, **trace_kwargs):
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+            if listing_filter:
+                listing_filter.learn(result['data'])
+            if snapshots and result['data']:
+                snapshots.append(listing_id_from_url(result['url']), result['data'])
+            count += 1
+            status = '✅' if result['data'] else '❌'
+            print(f"{status} [{count}] {result['url']} ({result['seconds']}s, worker {result['worker']})")
+
+    if listing_filter:
+        listing_filter.geocode_cache.save()
+    if snapshots:
+        snapshots.close()
+    scraper.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"\n🏁 {count} listings in {elapsed:.1f}s ({count / elapsed:.2f}/s)")
+    if args.trace:
+        print(f"🔎 Stage traces in {args.trace}/ (python instrumentation.py {args.trace}/*.jsonl)")
@@ -0,0 +1,289 @@
+import argparse
+import gzip
+import json
+import queue
+import re
+import sys
+import threading
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urlparse, urlencode, parse_qsl, urlunparse
+
+import requests
+
+from listing_parser import ListingPageParser, walk_json, to_int, find_price_in_text, listing_id_from_url
+from photo_downloader import HostRateLimiter
+
+LISTING_PATH_PATTERN = re.compile(r'/pages/listings/([A-Za-z0-9_-]+)')
+
+# Keys on search result JSON nodes that can hold the listing link
+LINK_KEYS = ['url', 'href', 'link', 'canonicalUrl', 'path', 'slug']
+PRICE_KEYS = ['pricePerHour', 'hourlyRate', 'hourlyPrice', 'price_per_hour', 'price']
+NAME_KEYS = ['name', 'title', 'listingTitle']
+
+# Stop paging when this many result pages in a row held only listings this search already saw
+EMPTY_PAGE_LIMIT = 2
+
+
+def listing_url_from(value, base_url):
+    """Canonical listing URL if value points at a listing page, else None"""
+    if not isinstance(value, str):
+        return None
+    match = LISTING_PATH_PATTERN.search(value)
+    if not match:
+        return None
+    parsed = urlparse(urljoin(base_url, value))
+    return urlunparse((parsed.scheme, parsed.netloc, match.group(0), '', '', ''))
+
+
+def node_coordinates(node):
+    """(lat, lng) from a result card JSON node or its geo/location child"""
+    for candidate in (node, node.get('geo'), node.get('location'), node.get('coordinates')):
+        if not isinstance(candidate, dict):
+            continue
+        for lat_key, lng_key in (('latitude', 'longitude'), ('lat', 'lng'), ('lat', 'lon')):
+            try:
+                lat, lng = float(candidate[lat_key]), float(candidate[lng_key])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if -90 <= lat <= 90 and -180 <= lng <= 180:
+                return lat, lng
+    return None, None
+
+
+def first_value(node, keys, convert=None):
+    for key in keys:
+        value = node.get(key)
+        if convert:
+            value = convert(value)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def cards_from_blobs(parser, page_url):
+    """Listing cards described in the page's embedded JSON (ld+json ItemList, __NEXT_DATA__, ...)"""
+    cards = {}
+    for blob in parser.embedded_blobs():
+        for node in walk_json(blob):
+            url = None
+            for key in LINK_KEYS:
+                url = listing_url_from(node.get(key), page_url)
+                if url:
+                    break
+            if not url:
+                continue
+            lat, lng = node_coordinates(node)
+            cards.setdefault(url, {}).update({
+                key: value for key, value in {
+                    'name': first_value(node, NAME_KEYS),
+                    'price_per_hour': first_value(node, PRICE_KEYS, to_int),
+                    'latitude': lat,
+                    'longitude': lng,
+                }.items() if value is not None
+            })
+    return cards
+
+
+def card_element(link):
+    """Largest ancestor of a result link that still holds only that one listing"""
+    card = link
+    for parent in link.parents:
+        if parent.name in ('body', 'html', '[document]'):
+            break
+        ids = {LISTING_PATH_PATTERN.search(a['href']).group(1)
+               for a in parent.select('a[href*="/pages/listings/"]') if LISTING_PATH_PATTERN.search(a['href'])}
+        if len(ids) > 1:
+            break
+        card = parent
+    return card
+
+
+def cards_from_markup(parser, page_url):
+    """Listing cards from result links: price and data-lat/data-lng shown on each card"""
+    cards = {}
+    for link in parser.soup.select('a[href*="/pages/listings/"]'):
+        url = listing_url_from(link.get('href'), page_url)
+        if not url or url in cards:
+            continue
+        card = card_element(link)
+        text = card.get_text('\n', strip=True)
+        info = {'price_per_hour': find_price_in_text(text)}
+        holder = card if card.get('data-lat') else card.find(attrs={'data-lat': True})
+        if holder is not None:
+            try:
+                info['latitude'], info['longitude'] = float(holder['data-lat']), float(holder['data-lng'])
+            except (KeyError, TypeError, ValueError):
+                pass
+        cards[url] = {key: value for key, value in info.items() if value is not None}
+    return cards
+
+
+def rel_next_url(parser, page_url):
+    """The page's rel=next link, None if it has none"""
+    link = parser.soup.select_one('link[rel="next"], a[rel="next"]')
+    if link is not None and link.get('href'):
+        return urljoin(page_url, link['href'])
+    return None
+
+
+def with_next_page_number(page_url, page_param='page'):
+    """Same URL with page_param incremented, for result pages without rel=next links"""
+    parsed = urlparse(page_url)
+    query = dict(parse_qsl(parsed.query))
+    query[page_param] = str(int(query.get(page_param) or 1) + 1)
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+class ListingDiscovery:
+    """Lazily page through search results or sitemaps and yield new listings
+
+    Each listing is a dict with 'url' and 'listing_id' plus whatever the result
+    card showed (price_per_hour, latitude/longitude, name), so it can go
+    straight into a crawl pool and its radius filter.
+    """
+
+    def __init__(self, session=None, known_ids=None, rate=1.0, burst=2, timeout=15, max_pages=50):
+        self.session = session or requests.Session()
+        self.known_ids = set(known_ids or ())  # e.g. ListingStore.known_ids() to only find new listings
+        self.seen = set()
+        self.limiter = HostRateLimiter(rate, burst)  # Search pages share the host with listing pages
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.stats = {'pages': 0, 'found': 0, 'new': 0}
+
+    def fetch(self, url):
+        self.limiter.acquire(url)
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        self.stats['pages'] += 1
+        return response
+
+    def accept(self, url, info):
+        """(first time this search saw the id, listing dict if it isn't already stored else None)"""
+        listing_id = listing_id_from_url(url)
+        self.stats['found'] += 1
+        if listing_id in self.seen:
+            return False, None
+        self.seen.add(listing_id)
+        if listing_id in self.known_ids:
+            return True, None  # Still progress through the results, just nothing to crawl
+        self.stats['new'] += 1
+        return True, dict(info, url=url, listing_id=listing_id)
+
+    def search(self, search_url, page_param='page'):
+        """Yield new listings page by page; the next page is only fetched once these are consumed"""
+        page_url = search_url
+        empty_pages = 0
+        follows_links = False
+        for _ in range(self.max_pages):
+            try:
+                response = self.fetch(page_url)
+            except Exception as e:
+                print(f"❌ Search page failed {page_url}: {e}", file=sys.stderr)
+                return
+
+            parser = ListingPageParser(response.text)
+            cards = cards_from_markup(parser, page_url)
+            for url, info in cards_from_blobs(parser, page_url).items():
+                cards.setdefault(url, {}).update(info)  # Embedded JSON beats card text
+
+            unseen = new = 0
+            for url, info in cards.items():
+                first_seen, listing = self.accept(url, info)
+                unseen += first_seen
+                if listing:
+                    new += 1
+                    yield listing
+
+            print(f"🔎 {page_url}: {len(cards)} listings, {new} new", file=sys.stderr)  # stdout may be piped
+            if not cards:
+                return  # Past the last result page
+            # Pages of already-stored listings still move through the results, only repeats mean we're looping
+            empty_pages = 0 if unseen else empty_pages + 1
+            if empty_pages >= EMPTY_PAGE_LIMIT:
+                return
+
+            next_url = rel_next_url(parser, page_url)
+            if next_url:
+                follows_links = True
+            elif follows_links:
+                return  # Earlier pages linked onwards, this one is the last
+            page_url = next_url or with_next_page_number(page_url, page_param)
+
+    def sitemap(self, sitemap_url):
+        """Yield new listings from a sitemap, following sitemap indexes lazily"""
+        try:
+            content = self.fetch(sitemap_url).content
+        except Exception as e:
+            print(f"❌ Sitemap failed {sitemap_url}: {e}", file=sys.stderr)
+            return
+        if content[:2] == b'\x1f\x8b':
+            content = gzip.decompress(content)
+
+        root = ET.fromstring(content)
+        is_index = root.tag.endswith('sitemapindex')
+        for loc in root.iter():
+            if not loc.tag.endswith('loc') or not loc.text:
+                continue
+            location = loc.text.strip()
+            if is_index:
+                yield from self.sitemap(location)
+                continue
+            url = listing_url_from(location, sitemap_url)
+            if url:
+                _, listing = self.accept(url, {})
+                if listing:
+                    yield listing
+
+
+def prefetch(items, maxsize=50):
+    """Run a (discovery) generator on a background thread behind a bounded queue
+
+    The consumer starts on the first item while the producer keeps paging; once
+    maxsize items are waiting the producer blocks until the consumer catches up.
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    done = object()
+
+    def produce():
+        try:
+            for item in items:
+                buffer.put(item)
+        except Exception as e:
+            buffer.put(e)
+        buffer.put(done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item = buffer.get()
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream Peerspace listing URLs from search results or a sitemap")
+    parser.add_argument('sources', nargs='+', help="search result URLs, or sitemap URLs ending in .xml/.xml.gz")
+    parser.add_argument('--max-pages', type=int, default=50)
+    parser.add_argument('--rate', type=float, default=1.0, help="max page fetches per second per host")
+    parser.add_argument('--new-only', default=None, metavar='STORE',
+                        help="skip listing ids already in this listing store")
+    parser.add_argument('--json', action='store_true', help="print card details as JSON lines instead of URLs")
+    args = parser.parse_args()
+
+    known_ids = ()
+    if args.new_only:
+        from listing_store import ListingStore
+        store = ListingStore(args.new_only)
+        known_ids = store.known_ids()
+        store.close()
+
+    from crawl_pool import discover, load_scraper_class
+    session = load_scraper_class()(use_http=True, selector_cache_path=None).setup_http_session()
+    discovery = ListingDiscovery(session, known_ids=known_ids, rate=args.rate, max_pages=args.max_pages)
+    for listing in discover(discovery, args.sources):
+        print(json.dumps(listing) if args.json else listing['url'], flush=True)
+    print(f"🏁 {discovery.stats['new']} new of {discovery.stats['found']} listings "
+          f"from {discovery.stats['pages']} pages", file=sys.stderr)
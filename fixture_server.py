@@ -0,0 +1,274 @@
+import hashlib
+import json
+import os
+import random
+import struct
+import sys
+import threading
+import time
+import zlib
+from functools import partial
+from urllib.parse import parse_qsl
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler, BaseHTTPRequestHandler
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """Static file handler without per-request log lines"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """Serve saved listing pages from a local folder on a background thread"""
+
+    def __init__(self, directory=FIXTURES_DIR, host='127.0.0.1', port=0):
+        self.directory = directory
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    def make_handler(self):
+        return partial(QuietHandler, directory=self.directory)
+
+    def start(self):
+        handler = self.make_handler()
+        self.httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def url(self, path=''):
+        """Absolute URL for a fixture file"""
+        return f"http://{self.host}:{self.port}/{path.lstrip('/')}"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+AMENITY_POOL = [
+    'Wi-Fi', 'Tables', 'Chairs', 'Natural light', 'Restrooms', 'Parking', 'Kitchen', 'Projector',
+    'Sound system', 'Air conditioning', 'Heating', 'Whiteboard', 'Stage', 'Dance floor', 'Bar',
+    'Green room', 'Wheelchair accessible', 'Outdoor area', 'Photo backdrop', 'Dressing room',
+]
+
+CATEGORY_POOL = ['Loft', 'Studio', 'Warehouse', 'Rooftop', 'Gallery', 'Event hall', 'Backyard']
+
+
+def make_png(width, height, total_bytes=0, seed=0):
+    """Valid solid-colour PNG, padded with a text chunk to roughly total_bytes"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    color = bytes([(seed * 37) % 256, (seed * 91) % 256, (seed * 53) % 256])
+    raw = (b'\x00' + color * width) * height
+    png = b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+    png += chunk(b'IDAT', zlib.compress(raw, 9))
+    padding = total_bytes - len(png) - 12 - 12
+    if padding > 0:
+        png += chunk(b'tEXt', b'pad\x00' + b'x' * (padding - 4))
+    return png + chunk(b'IEND', b'')
+
+
+class SyntheticSiteHandler(BaseHTTPRequestHandler):
+    """Peerspace-like listing pages and photos generated from the listing id
+
+    /pages/listings/<id>       listing page with gallery buttons and a View all modal
+    /photos/<id>/<n>.png       photo with an ETag (honours If-None-Match)
+    /s?page=<n>                search results with price and data-lat/data-lng on each card
+    /sitemap.xml               every listing URL
+    """
+
+    site = None  # SyntheticSite config, set per server
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        site = self.site
+        if site.latency:
+            time.sleep(site.latency)
+
+        path, _, query = self.path.partition('?')
+        parts = path.strip('/').split('/')
+        if parts == ['s']:
+            page = int(dict(parse_qsl(query)).get('page') or 1)
+            return self.respond(200, 'text/html; charset=utf-8', site.search_html(page).encode('utf-8'))
+
+        if parts == ['sitemap.xml']:
+            return self.respond(200, 'application/xml', site.sitemap_xml(self.base_url()).encode('utf-8'))
+
+        if parts[:2] == ['pages', 'listings'] and len(parts) == 3:
+            body = site.listing_html(parts[2]).encode('utf-8')
+            return self.respond(200, 'text/html; charset=utf-8', body)
+
+        if parts[0] == 'photos' and len(parts) == 3:
+            listing_id, name = parts[1], parts[2]
+            body = site.photo_bytes(listing_id, name)
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                return self.respond(304, None, b'', {'ETag': etag})
+            return self.respond(200, 'image/png', body, {'ETag': etag})
+
+        self.respond(404, 'text/plain', b'not found')
+
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def respond(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+        site_stats = self.site.stats
+        with self.site.lock:
+            site_stats['requests'] += 1
+            site_stats['bytes'] += len(body)
+
+
+class SyntheticSite:
+    """Knobs for the generated site: photo counts, amenities, gallery modal, latency"""
+
+    def __init__(self, photo_count=12, amenity_count=8, gallery_modal=True, latency=0.0,
+                 photo_size=(800, 600), photo_bytes=200 * 1024, listing_count=100, per_page=20):
+        self.photo_count = photo_count
+        self.amenity_count = amenity_count
+        self.gallery_modal = gallery_modal
+        self.latency = latency
+        self.photo_size = photo_size
+        self.photo_bytes_target = photo_bytes
+        self.listing_count = listing_count
+        self.per_page = per_page
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'bytes': 0}
+        self.photo_cache = {}
+
+    def listing_ids(self):
+        return [f"{i:024x}" for i in range(self.listing_count)]
+
+    def listing_facts(self, listing_id):
+        """Name, price, capacity, amenities and location drawn from the listing id (plus the rng)"""
+        rng = random.Random(listing_id)
+        name = f"{rng.choice(['Sunny', 'Urban', 'Quiet', 'Grand', 'Modern'])} {rng.choice(CATEGORY_POOL)} {listing_id[-4:]}"
+        price = rng.randrange(40, 400, 5)
+        capacity = rng.randrange(10, 200, 5)
+        amenities = rng.sample(AMENITY_POOL, min(self.amenity_count, len(AMENITY_POOL)))
+        lat = 34.0627 + rng.uniform(-0.1, 0.1)
+        lng = -118.1834 + rng.uniform(-0.1, 0.1)
+        return (name, price, capacity, amenities, lat, lng), rng
+
+    def search_html(self, page):
+        """One page of search result cards, with a rel=next link until the last page"""
+        ids = self.listing_ids()[(page - 1) * self.per_page:page * self.per_page]
+        cards = []
+        for listing_id in ids:
+            (name, price, _, _, lat, lng), _ = self.listing_facts(listing_id)
+            cards.append(
+                f'<div class="result-card" data-lat="{lat:.5f}" data-lng="{lng:.5f}">'
+                f'<a href="/pages/listings/{listing_id}?ref=search"><h3>{name}</h3></a>'
+                f'<span class="price">${price}/hr</span></div>'
+            )
+        next_link = ''
+        if page * self.per_page < self.listing_count:
+            next_link = f'<a rel="next" href="/s?page={page + 1}">Next</a>'
+        return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Search results</title></head>
+<body><main><div class="results">{''.join(cards)}</div>{next_link}</main></body></html>"""
+
+    def sitemap_xml(self, base_url):
+        urls = ''.join(f"<url><loc>{base_url}/pages/listings/{listing_id}</loc></url>"
+                       for listing_id in self.listing_ids())
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+
+    def listing_html(self, listing_id):
+        (name, price, capacity, amenities, lat, lng), rng = self.listing_facts(listing_id)
+        photos = [f"/photos/{listing_id}/{n:02d}.png" for n in range(1, self.photo_count + 1)]
+
+        ld_json = json.dumps({
+            '@context': 'https://schema.org', '@type': 'LocalBusiness', 'name': name,
+            'address': {'streetAddress': f"{rng.randrange(100, 9999)} Main St", 'addressLocality': 'Los Angeles',
+                        'addressRegion': 'CA'},
+            'geo': {'latitude': round(lat, 5), 'longitude': round(lng, 5)},
+        })
+        buttons = ''.join(
+            f'<button class="tw-aspect-square"><span><img src="{src}" style="width:300px;height:220px"></span></button>'
+            for src in photos[:3]
+        )
+        modal = ''
+        view_all = ''
+        if self.gallery_modal:
+            modal_images = ''.join(f'<img src="{src}" loading="lazy" style="width:300px;height:220px">' for src in photos)
+            modal = f'<div role="dialog" class="gallery-modal" id="gallery" style="display:none">{modal_images}</div>'
+            view_all = ('<div class="tw-absolute"><span data-testing-id="photoWithViewAllButton" '
+                        'onclick="document.getElementById(\'gallery\').style.display=\'block\'">View all</span></div>')
+        amenity_items = ''.join(f'<li>{amenity}</li>' for amenity in amenities)
+
+        return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{name}</title>
+<script type="application/ld+json">{ld_json}</script></head>
+<body><main>
+<h1>{name}</h1>
+<div class="location-text">Los Angeles, CA</div>
+<span class="space-type">{rng.choice(CATEGORY_POOL)}</span>
+{view_all}{buttons}
+<div class="pricing"><span>${price}/hr</span><span>{rng.choice([1, 2, 3, 4])} hr minimum</span><span>Cleaning fee ${rng.randrange(25, 150, 25)}</span></div>
+<div class="capacity">Up to {capacity} people</div>
+<div data-testid="listing-description"><p>{name} is a flexible space for shoots, meetings and events with plenty of room to spread out and easy access from downtown.</p></div>
+<ul class="amenities">{amenity_items}</ul>
+<div data-testid="host-card"><span class="host-name">Host {listing_id[:4]}</span></div>
+{modal}
+</main></body></html>"""
+
+    def photo_bytes(self, listing_id, name):
+        key = (listing_id, name)
+        if key not in self.photo_cache:
+            seed = int(hashlib.md5(f"{listing_id}/{name}".encode()).hexdigest()[:6], 16)
+            self.photo_cache[key] = make_png(*self.photo_size, total_bytes=self.photo_bytes_target, seed=seed)
+        return self.photo_cache[key]
+
+
+class SyntheticSiteServer(FixtureServer):
+    """FixtureServer that serves a generated SyntheticSite instead of a folder"""
+
+    def __init__(self, site=None, host='127.0.0.1', port=0):
+        super().__init__(directory=None, host=host, port=port)
+        self.site = site or SyntheticSite()
+
+    def make_handler(self):
+        return type('BoundSyntheticSiteHandler', (SyntheticSiteHandler,), {'site': self.site})
+
+    def listing_url(self, listing_id):
+        return self.url(f"pages/listings/{listing_id}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--synthetic':
+        server = SyntheticSiteServer(port=8765).start()
+        print(f"🧪 Serving synthetic listings at {server.listing_url('<any id>')}")
+    else:
+        directory = sys.argv[1] if len(sys.argv) > 1 else FIXTURES_DIR
+        server = FixtureServer(directory, port=8765).start()
+        print(f"📂 Serving {directory} at {server.url()}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,109 @@
+import posixpath
+from urllib.parse import urlparse
+
+# Network-log images smaller than this are icons or thumbnails, not gallery photos
+MIN_NETWORK_PHOTO_BYTES = 8 * 1024
+
+# One script call returns src, rendered size, intrinsic size and parent class
+# for every image under each selector, plus image URLs from the resource timing log
+HARVEST_SCRIPT = """
+const selectors = arguments[0];
+const withResources = arguments[1];
+const groups = selectors.map(sel => {
+    let images;
+    try { images = Array.from(document.querySelectorAll(sel)); } catch (e) { return []; }
+    return images.map(img => {
+        const rect = img.getBoundingClientRect();
+        const parent = img.parentElement;
+        return {
+            src: img.src || img.getAttribute('data-src') || '',
+            width: Math.round(rect.width),
+            height: Math.round(rect.height),
+            natural_width: img.naturalWidth || 0,
+            natural_height: img.naturalHeight || 0,
+            parent_class: parent ? (parent.getAttribute('class') || '') : ''
+        };
+    });
+});
+let resources = [];
+if (withResources) {
+    resources = performance.getEntriesByType('resource')
+        .filter(e => e.initiatorType === 'img' || /\\.(jpe?g|png|webp|avif)(\\?|$)/i.test(e.name))
+        .map(e => ({src: e.name, bytes: e.encodedBodySize || 0}));
+}
+return {groups: groups, resources: resources};
+"""
+
+
+# First element matched by a list of ('css' | 'xpath', selector) candidates, in priority order
+FIND_FIRST_SCRIPT = """
+const candidates = arguments[0];
+for (let i = 0; i < candidates.length; i++) {
+    const [kind, selector] = candidates[i];
+    let element = null;
+    try {
+        element = kind === 'xpath'
+            ? document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+            : document.querySelector(selector);
+    } catch (e) { continue; }
+    if (element) { return [i, element]; }
+}
+return null;
+"""
+
+
+def find_first(driver, candidates):
+    """(index, element) of the first candidate that matches, in one browser command
+
+    candidates are ('css' | 'xpath', selector) pairs; (None, None) if none match.
+    """
+    found = driver.execute_script(FIND_FIRST_SCRIPT, [list(candidate) for candidate in candidates])
+    if not found:
+        return None, None
+    return found[0], found[1]
+
+
+def harvest_images(driver, selectors, with_resources=False):
+    """Image records for every selector in one browser command
+
+    Returns (groups, resources): groups[i] is the list of records matched by
+    selectors[i], resources lists image URLs the page fetched over the network.
+    """
+    result = driver.execute_script(HARVEST_SCRIPT, list(selectors), with_resources) or {}
+    groups = result.get('groups') or [[] for _ in selectors]
+    return groups, result.get('resources') or []
+
+
+def record_size(record):
+    """Rendered size, or intrinsic size when the image isn't laid out"""
+    width = record.get('width') or record.get('natural_width') or 0
+    height = record.get('height') or record.get('natural_height') or 0
+    return width, height
+
+
+def photo_prefix(url):
+    """(host, directory) a photo URL is served from"""
+    parsed = urlparse(url)
+    return parsed.netloc, posixpath.dirname(parsed.path)
+
+
+def network_photo_urls(resources, known_photos, is_photo_url, min_bytes=MIN_NETWORK_PHOTO_BYTES):
+    """Gallery URLs seen on the network under the same host and directory as known photos
+
+    Carousels often unload slides, so the network log catches photos that are no
+    longer in the DOM. Only the directories already serving this listing's
+    accepted photos are trusted, so other listings' thumbnails and site images
+    from the same CDN stay out; resources too small to be a photo are dropped
+    (size 0 means the CDN hid it, those pass).
+    """
+    prefixes = {photo_prefix(src) for src in known_photos}
+    prefixes = {(host, directory) for host, directory in prefixes if directory.strip('/')}
+    urls = []
+    for resource in resources:
+        src = resource.get('src')
+        if not src or photo_prefix(src) not in prefixes or not is_photo_url(src):
+            continue
+        if 0 < (resource.get('bytes') or 0) < min_bytes:
+            continue
+        urls.append(src)
+    return urls
@@ -0,0 +1,277 @@
+import json
+import os
+import re
+
+import numpy as np
+from geopy.distance import geodesic
+
+from listing_parser import listing_id_from_url
+
+EARTH_RADIUS_MILES = 3958.7613
+MILES_PER_DEGREE_LAT = 69.05
+
+# Haversine on a sphere is off from the WGS-84 geodesic by up to ~0.5%,
+# so only points within this fraction of the radius boundary get the exact check
+BOUNDARY_TOLERANCE = 0.006
+
+
+def haversine_miles(lat, lng, lats, lngs):
+    """Great-circle distance from one point to arrays of points, in miles"""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlng = np.radians(np.asarray(lngs, dtype=np.float64) - lng)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeoIndex:
+    """Venue coordinates in NumPy arrays with a lat/lng grid for radius and k-nearest queries"""
+
+    def __init__(self, cell_degrees=0.05):
+        self.cell_degrees = cell_degrees
+        self.ids = []
+        self.lats = np.empty(0)
+        self.lngs = np.empty(0)
+        self.cells = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, ids, lats, lngs):
+        """Replace the index contents and rebuild the grid"""
+        self.ids = list(ids)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+
+        rows = np.floor(self.lats / self.cell_degrees).astype(np.int64)
+        cols = np.floor(self.lngs / self.cell_degrees).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        keys = np.stack([rows[order], cols[order]], axis=1)
+        self.cells = {}
+        if len(order):
+            unique, starts = np.unique(keys, axis=0, return_index=True)
+            ends = list(starts[1:]) + [len(order)]
+            for (row, col), start, end in zip(unique, starts, ends):
+                self.cells[(int(row), int(col))] = order[start:end]
+        return self
+
+    def add(self, ids, lats, lngs):
+        """Append venues and rebuild; batch these, rebuilding is O(n log n)"""
+        return self.build(self.ids + list(ids), np.concatenate([self.lats, lats]), np.concatenate([self.lngs, lngs]))
+
+    def candidates(self, lat, lng, miles):
+        """Indices of points in grid cells overlapping the query's bounding box"""
+        dlat = miles / MILES_PER_DEGREE_LAT
+        dlng = miles / (MILES_PER_DEGREE_LAT * max(np.cos(np.radians(lat)), 0.01))
+        row_lo, row_hi = (int(np.floor((lat + d) / self.cell_degrees)) for d in (-dlat, dlat))
+        col_lo, col_hi = (int(np.floor((lng + d) / self.cell_degrees)) for d in (-dlng, dlng))
+
+        hits = [self.cells[(row, col)]
+                for row in range(row_lo, row_hi + 1)
+                for col in range(col_lo, col_hi + 1)
+                if (row, col) in self.cells]
+        return np.concatenate(hits) if hits else np.empty(0, dtype=np.int64)
+
+    def within_radius(self, center, miles, exact=True):
+        """(ids, distances) of venues within `miles` of center, nearest first"""
+        lat, lng = center
+        idx = self.candidates(lat, lng, miles * (1 + BOUNDARY_TOLERANCE))
+        if not len(idx):
+            return [], np.empty(0)
+
+        dist = haversine_miles(lat, lng, self.lats[idx], self.lngs[idx])
+        keep = dist <= miles
+        if exact:
+            # Re-check only the thin band around the boundary with the exact geodesic
+            band = np.abs(dist - miles) <= miles * BOUNDARY_TOLERANCE
+            for i in np.nonzero(band)[0]:
+                dist[i] = geodesic(center, (self.lats[idx[i]], self.lngs[idx[i]])).miles
+                keep[i] = dist[i] <= miles
+
+        idx, dist = idx[keep], dist[keep]
+        order = np.argsort(dist)
+        return [self.ids[i] for i in idx[order]], dist[order]
+
+    def nearest(self, center, k=10):
+        """(ids, distances) of the k venues nearest to center"""
+        if not len(self.ids):
+            return [], np.empty(0)
+        k = min(k, len(self.ids))
+        lat, lng = center
+
+        # Grow the search box until it holds k points, then one radius query
+        # at the k-th distance guarantees nothing closer was outside the box
+        miles = self.cell_degrees * MILES_PER_DEGREE_LAT
+        while True:
+            idx = self.candidates(lat, lng, miles)
+            if len(idx) >= k:
+                break
+            miles *= 2
+
+        dist = haversine_miles(lat, lng, self.lats[idx], self.lngs[idx])
+        kth = np.partition(dist, k - 1)[k - 1]
+        idx = self.candidates(lat, lng, kth)
+        dist = haversine_miles(lat, lng, self.lats[idx], self.lngs[idx])
+        top = np.argsort(dist)[:k]
+        return [self.ids[i] for i in idx[top]], dist[top]
+
+
+def normalize_address(address):
+    return re.sub(r'\s+', ' ', (address or '').strip().lower().replace('.', ''))
+
+
+class GeocodeCache:
+    """Offline address -> (lat, lng) cache, plus listing id -> (lat, lng) learned from crawls
+
+    A geocoder is only called on an address miss if given.
+    """
+
+    def __init__(self, path='geocode_cache.json', geocoder=None):
+        self.path = path
+        self.geocoder = geocoder  # e.g. geopy's Nominatim(...).geocode behind a RateLimiter
+        self.entries = {}
+        self.listings = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if 'addresses' in data:
+                self.entries, self.listings = data['addresses'], data.get('listings', {})
+            else:
+                self.entries = data  # Older caches only held addresses
+
+    def get(self, address):
+        """Cached coordinates, None if unknown (or known to be ungeocodable)"""
+        key = normalize_address(address)
+        if not key:
+            return None
+        if key in self.entries:
+            entry = self.entries[key]
+            return tuple(entry) if entry else None
+        if self.geocoder is None:
+            return None
+
+        location = self.geocoder(address)
+        coords = (location.latitude, location.longitude) if location else None
+        self.put(address, coords)
+        return coords
+
+    def put(self, address, coords):
+        key = normalize_address(address)
+        if key:
+            self.entries[key] = list(coords) if coords else None
+            self.dirty = True
+
+    def get_listing(self, listing_id):
+        entry = self.listings.get(listing_id)
+        return tuple(entry) if entry else None
+
+    def put_listing(self, listing_id, coords):
+        self.listings[listing_id] = list(coords)
+        self.dirty = True
+
+    def save(self):
+        if self.dirty and self.path:
+            with open(self.path, 'w') as f:
+                json.dump({'addresses': self.entries, 'listings': self.listings}, f, indent=1, sort_keys=True)
+            self.dirty = False
+
+
+class RadiusFilter:
+    """Drop listings outside max_miles of a target before anything is fetched
+
+    Listings that carry coordinates or an address are measured directly. Plain
+    URLs are looked up by listing id in a GeoIndex of every listing an earlier
+    crawl located, so a URL-file recrawl skips the far ones without fetching.
+    """
+
+    def __init__(self, center, max_miles, geocode_cache=None, keep_unknown=True):
+        self.center = center
+        self.max_miles = max_miles
+        self.geocode_cache = geocode_cache or GeocodeCache()
+        self.keep_unknown = keep_unknown  # Listings without coordinates can't be ruled out
+        self.indexed_ids = None      # Listings located before this filter started, built into a GeoIndex once
+        self.index_distances = None  # listing_id -> miles for indexed listings inside the radius
+
+    def coordinates(self, listing):
+        """(lat, lng) from the listing itself or the geocode cache, else None"""
+        if not isinstance(listing, dict):
+            return None
+        if listing.get('latitude') is not None and listing.get('longitude') is not None:
+            return float(listing['latitude']), float(listing['longitude'])
+        if listing.get('address'):
+            return self.geocode_cache.get(listing['address'])
+        return None
+
+    def indexed_distances(self):
+        """{listing_id: miles} inside the radius, from one GeoIndex query over the learned listings"""
+        if self.index_distances is None:
+            known = self.geocode_cache.listings
+            ids = list(known)
+            self.indexed_ids = set(ids)
+            coords = np.array([known[listing_id] for listing_id in ids], dtype=np.float64).reshape(-1, 2)
+            index = GeoIndex().build(ids, coords[:, 0], coords[:, 1])
+            inside, dist = index.within_radius(self.center, self.max_miles)
+            self.index_distances = dict(zip(inside, dist.tolist()))
+        return self.index_distances
+
+    def indexed_distance(self, listing):
+        """Distance for a listing known only by its URL/id: miles, inf if learned and outside, None if never located"""
+        url = listing.get('url') if isinstance(listing, dict) else listing
+        if not url:
+            return None
+        listing_id = listing_id_from_url(url)
+        distances = self.indexed_distances()
+        if listing_id not in self.indexed_ids:
+            return None
+        return distances.get(listing_id, np.inf)
+
+    def distances(self, listings):
+        """Distance in miles for each listing, NaN where the location is unknown"""
+        coords = [self.coordinates(listing) for listing in listings]
+        known = np.array([c is not None for c in coords], dtype=bool)
+        dist = np.full(len(listings), np.nan)
+        for i in np.nonzero(~known)[0]:
+            miles = self.indexed_distance(listings[i])
+            if miles is not None:
+                dist[i] = miles
+        if known.any():
+            points = np.array([c for c in coords if c is not None], dtype=np.float64)
+            dist[known] = haversine_miles(self.center[0], self.center[1], points[:, 0], points[:, 1])
+
+            # Exact check only near the boundary
+            band = np.nonzero(known)[0][np.abs(dist[known] - self.max_miles) <= self.max_miles * BOUNDARY_TOLERANCE]
+            for i in band:
+                dist[i] = geodesic(self.center, coords[i]).miles
+        return dist
+
+    def filter_listings(self, listings):
+        """Listings inside the radius (plus unknown ones if keep_unknown), with a 'distance_miles' key"""
+        listings = list(listings)
+        dist = self.distances(listings)
+        kept = []
+        for listing, miles in zip(listings, dist):
+            if np.isnan(miles):
+                if self.keep_unknown:
+                    kept.append(listing)
+                continue
+            if miles <= self.max_miles:
+                if isinstance(listing, dict):
+                    listing['distance_miles'] = round(float(miles), 3)
+                kept.append(listing)
+        return kept
+
+    def __call__(self, listing):
+        """Single-listing check, usable as a crawl pool listing_filter"""
+        return bool(self.filter_listings([listing]))
+
+    def learn(self, venue_data):
+        """Remember a scraped venue's coordinates by listing id and address for future runs"""
+        if not venue_data or venue_data.get('latitude') is None or venue_data.get('longitude') is None:
+            return
+        coords = (venue_data['latitude'], venue_data['longitude'])
+        if venue_data.get('url'):
+            self.geocode_cache.put_listing(listing_id_from_url(venue_data['url']), coords)
+        if venue_data.get('address'):
+            self.geocode_cache.put(venue_data['address'], coords)
@@ -0,0 +1,206 @@
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+
+class NullSpan:
+    """Shared do-nothing span handed out while instrumentation is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    def __init__(self, instrumentation, name, attrs):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        stack = self.instrumentation.stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        self.instrumentation.stack().pop()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.instrumentation.finish_span(self, duration)
+        return False
+
+    def set(self, **attrs):
+        """Attach attributes discovered while the span is running"""
+        self.attrs.update(attrs)
+
+
+class Instrumentation:
+    """Stage timing spans, WebDriver/HTTP counters and a JSON-lines trace
+
+    Disabled instances hand out a shared no-op span and skip driver/session
+    hooks entirely, so leaving the calls in the hot path costs almost nothing.
+    """
+
+    def __init__(self, enabled=True, trace_path=None):
+        self.enabled = enabled
+        self.counters = Counter()
+        self.durations = defaultdict(list)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.trace = None
+        if enabled and trace_path:
+            trace_path = trace_path.format(pid=os.getpid())
+            os.makedirs(os.path.dirname(trace_path) or '.', exist_ok=True)
+            self.trace = open(trace_path, 'a', buffering=1)
+
+    def stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attrs)
+
+    def finish_span(self, span, duration):
+        with self.lock:
+            self.durations[span.name].append(duration)
+            if self.trace:
+                self.trace.write(json.dumps({
+                    'type': 'span', 'name': span.name, 'parent': span.parent, 'pid': os.getpid(),
+                    'start': round(span.wall_started, 6), 'ms': round(duration * 1000, 3), **span.attrs,
+                }) + '\n')
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] += n
+
+    def wrap_driver(self, driver):
+        """Count and time every WebDriver command the driver sends"""
+        if not self.enabled:
+            return driver
+        execute = driver.execute
+
+        @functools.wraps(execute)
+        def counted_execute(driver_command, params=None):
+            self.count('webdriver.commands')
+            self.count(f"webdriver.{driver_command}")
+            with self.span('webdriver', command=driver_command):
+                return execute(driver_command, params)
+
+        driver.execute = counted_execute
+        return driver
+
+    def wrap_session(self, session):
+        """Count HTTP requests and response bytes on a requests session"""
+        if not self.enabled:
+            return session
+
+        def on_response(response, *args, **kwargs):
+            self.count('http.requests')
+            self.count(f"http.status.{response.status_code}")
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit():
+                self.count('http.bytes', int(length))
+
+        session.hooks.setdefault('response', []).append(on_response)
+        return session
+
+    def summary(self):
+        """Per-span count/p50/p90/p99 in ms plus counter totals"""
+        with self.lock:
+            spans = {name: duration_stats(np.asarray(values) * 1000) for name, values in self.durations.items()}
+            return {'spans': spans, 'counters': dict(self.counters)}
+
+    def flush(self):
+        """Write the counters to the trace (call at the end of a run)"""
+        if self.trace:
+            with self.lock:
+                self.trace.write(json.dumps({'type': 'counters', 'pid': os.getpid(), 'time': time.time(),
+                                             **self.counters}) + '\n')
+
+    def close(self):
+        self.flush()
+        if self.trace:
+            self.trace.close()
+            self.trace = None
+
+
+def duration_stats(ms):
+    return {
+        'count': int(len(ms)),
+        'total_ms': round(float(ms.sum()), 2),
+        'mean_ms': round(float(ms.mean()), 2),
+        'p50_ms': round(float(np.percentile(ms, 50)), 2),
+        'p90_ms': round(float(np.percentile(ms, 90)), 2),
+        'p99_ms': round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+def instrumented(stage):
+    """Method decorator: run inside a span named `stage` when self.instrumentation is enabled"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = self.instrumentation
+            if not instrumentation.enabled:
+                return method(self, *args, **kwargs)
+            with instrumentation.span(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def aggregate_traces(paths):
+    """Combine JSON-lines traces from one or many workers into a summary"""
+    durations = defaultdict(list)
+    counters = Counter()
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                event = json.loads(line)
+                if event['type'] == 'span':
+                    durations[event['name']].append(event['ms'])
+                elif event['type'] == 'counters':
+                    counters.update({key: value for key, value in event.items()
+                                     if key not in ('type', 'pid', 'time')})
+    spans = {name: duration_stats(np.asarray(values)) for name, values in durations.items()}
+    return {'spans': spans, 'counters': dict(counters)}
+
+
+DISABLED = Instrumentation(enabled=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate scraper JSON-lines traces")
+    parser.add_argument('traces', nargs='+')
+    args = parser.parse_args()
+
+    summary = aggregate_traces(args.traces)
+    print(f"{'span':<28}{'count':>8}{'total s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for name, stats in sorted(summary['spans'].items(), key=lambda item: -item[1]['total_ms']):
+        print(f"{name:<28}{stats['count']:>8}{stats['total_ms'] / 1000:>10.2f}"
+              f"{stats['p50_ms']:>10.2f}{stats['p90_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    print()
+    for name, value in sorted(summary['counters'].items()):
+        print(f"{name:<40}{value:>12}")
@@ -0,0 +1,493 @@
+import json
+import re
+from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup
+
+from pricing import extract_pricing
+from selector_cache import page_template
+
+# Selector lists shared by the Selenium path and the HTML parser
+NAME_SELECTORS = [
+    'h1',
+    '[data-testid*="title"]',
+    '.listing-title',
+    '.space-title'
+]
+
+ADDRESS_SELECTORS = [
+    '.location-text',
+    '.neighborhood',
+    '[class*="address"]',
+    '[class*="location"]'
+]
+
+CATEGORY_SELECTORS = [
+    '.space-type',
+    '.listing-type',
+    '[class*="category"]',
+    '.tag',
+    '.badge',
+    'span[class*="type"]'
+]
+
+HOST_SELECTORS = [
+    '[data-testid*="host"]',
+    '.host-name',
+    '[class*="host"]'
+]
+
+DESCRIPTION_SELECTORS = [
+    '[data-testid*="description"]',
+    '.description',
+    '.about',
+    '.details p',
+    'p'
+]
+
+AMENITY_SELECTORS = [
+    '.amenity',
+    '.feature',
+    '.amenities li',
+    '[data-testid*="amenity"]',
+    '.facilities li',
+    'li'
+]
+
+PHOTO_SELECTORS = [
+    'button[class*="tw-aspect"] img',
+    'button span img',
+    'button img'
+]
+
+# The full gallery; often already in the markup, hidden until "View all" is clicked
+GALLERY_MODAL_SELECTORS = [
+    '.modal img',
+    '.overlay img',
+    '.gallery-modal img',
+    '.lightbox img',
+    '[role="dialog"] img',
+    '.tw-fixed img',  # Tailwind fixed positioning (modal)
+    'div[class*="tw-fixed"] img',
+    '.carousel img',
+    '.slider img'
+]
+
+# Catch-alls at the back of the lists above: they match nearly any page, so the
+# selector cache never moves them ahead of the specific selectors
+FALLBACK_SELECTORS = ['p', 'li', '.tag', '.badge', 'button img']
+
+PHOTO_SKIP_KEYWORDS = ['logo', 'icon', 'avatar', 'profile', 'star', 'heart', 'arrow', 'close', 'x.svg']
+
+# Fields that must be filled before we trust a browserless parse
+REQUIRED_FIELDS = ['name', 'price_per_hour', 'photos']
+
+# Keys we look for inside embedded JSON/state blobs
+JSON_KEYS = {
+    'name': ['name', 'title', 'listingTitle'],
+    'price_per_hour': ['pricePerHour', 'hourlyRate', 'hourlyPrice', 'price_per_hour', 'price'],
+    'capacity': ['capacity', 'maxCapacity', 'maxGuests', 'maximumAttendeeCapacity', 'maxOccupancy'],
+    'address': ['formattedAddress', 'address', 'location'],
+    'category': ['spaceType', 'category', 'listingType'],
+    'description': ['description', 'about'],
+    'amenities': ['amenities', 'amenityFeature', 'features'],
+    'photos': ['photos', 'images', 'image', 'gallery'],
+    'host_name': ['hostName', 'host'],
+}
+
+# schema.org types that describe the listing itself, unlike breadcrumbs, the site or reviews
+LISTING_TYPES = {'Place', 'LocalBusiness', 'EventVenue', 'Product', 'Accommodation', 'Residence'}
+
+# Keys that carry the listing id in state blobs
+ID_KEYS = ['id', '_id', 'listingId', '@id']
+
+HIDDEN_TAGS = ['script', 'style', 'noscript', 'template']
+
+STATE_BLOB_PATTERN = re.compile(
+    r'window\.(?:__INITIAL_STATE__|__APOLLO_STATE__|__PRELOADED_STATE__)\s*=\s*(\{.*?\})\s*;?\s*(?:</script>|$)',
+    re.DOTALL
+)
+
+
+def listing_id_from_url(listing_url):
+    """Peerspace listing id, the last path segment of /pages/listings/<id>"""
+    path = urlparse(listing_url).path.rstrip('/')
+    return path.rsplit('/', 1)[-1] if path else listing_url
+
+
+def is_empty_value(value):
+    """True for the placeholder values the scraper uses for missing fields"""
+    return value in (None, '', [], 'Not found', 'No description found')
+
+
+def missing_required_fields(venue_data):
+    """List required fields that came back empty"""
+    return [field for field in REQUIRED_FIELDS if is_empty_value(venue_data.get(field))]
+
+
+def find_price_in_text(page_text):
+    """Best-ranked hourly rate in page text, see pricing.extract_pricing"""
+    return extract_pricing(page_text)['price_per_hour']
+
+
+def find_capacity_in_text(page_text):
+    """Stated (or largest tiered) capacity in page text"""
+    return extract_pricing(page_text)['capacity']
+
+
+def is_venue_photo_url(src):
+    """Keyword filter for photo URLs when no rendered size is available"""
+    if not src or src.startswith('data:'):
+        return False
+    src_lower = src.lower()
+    return not any(keyword in src_lower for keyword in PHOTO_SKIP_KEYWORDS)
+
+
+def to_int(value):
+    """Pull an int out of numbers, numeric strings and {'value': ...} dicts"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, dict):
+        for key in ('value', 'amount', 'max', 'maxValue'):
+            if key in value:
+                return to_int(value[key])
+        return None
+    if isinstance(value, str):
+        match = re.search(r'\d+(?:\.\d+)?', value.replace(',', ''))
+        if match:
+            return int(float(match.group()))
+    return None
+
+
+def _to_text(value):
+    """Flatten strings and address/name dicts to plain text"""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        if 'name' in value and isinstance(value['name'], str):
+            return value['name'].strip()
+        parts = [value.get(key) for key in ('streetAddress', 'addressLocality', 'addressRegion', 'postalCode')]
+        parts = [part for part in parts if isinstance(part, str) and part.strip()]
+        if parts:
+            return ', '.join(parts)
+    return ''
+
+
+def _to_text_list(value):
+    """Flatten amenity lists of strings or {'name': ...} dicts"""
+    if isinstance(value, str):
+        return [value.strip()] if value.strip() else []
+    if isinstance(value, list):
+        items = []
+        for item in value:
+            items.extend(_to_text_list(item) if isinstance(item, (str, list)) else [_to_text(item)])
+        return [item for item in items if item]
+    if isinstance(value, dict):
+        text = _to_text(value)
+        return [text] if text else []
+    return []
+
+
+def _to_url_list(value):
+    """Flatten photo lists of URL strings or {'url': ...} dicts"""
+    if isinstance(value, str):
+        return [value] if value.startswith('http') else []
+    if isinstance(value, list):
+        urls = []
+        for item in value:
+            urls.extend(_to_url_list(item))
+        return urls
+    if isinstance(value, dict):
+        for key in ('url', 'src', 'contentUrl', 'originalUrl'):
+            if isinstance(value.get(key), str):
+                return _to_url_list(value[key])
+    return []
+
+
+CONVERTERS = {
+    'name': _to_text,
+    'price_per_hour': to_int,
+    'capacity': to_int,
+    'address': _to_text,
+    'category': _to_text,
+    'description': _to_text,
+    'amenities': _to_text_list,
+    'photos': _to_url_list,
+    'host_name': _to_text,
+}
+
+
+def walk_json(node):
+    """Yield every dict inside a JSON blob, depth first"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            yield current
+            stack.extend(reversed(list(current.values())))
+        elif isinstance(current, list):
+            stack.extend(reversed(current))
+
+
+class ListingPageParser:
+    """Extract venue fields from listing HTML without a browser"""
+
+    def __init__(self, html, body_text=None, selector_cache=None, template=None, listing_id=None):
+        self.html = html
+        self._soup = None
+        self.listing_id = listing_id  # Picks the listing's own node out of the blobs, parse() fills it in
+        self._blobs = None
+        self._body_text = body_text  # Rendered innerText when captured from a browser
+        self._pricing = None
+        self.selector_cache = selector_cache  # Tries the selector that won last time first
+        self.template = template
+
+    @property
+    def soup(self):
+        """Parsed tree, built on first use: an unchanged page is fingerprinted from the html alone"""
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html, 'html.parser')
+        return self._soup
+
+    def body_text(self):
+        """Visible body text, roughly what Selenium's body.text returns"""
+        if self._body_text is None:
+            body = self.soup.body or self.soup
+            lines = []
+            for string in body.find_all(string=True):
+                if string.find_parent(HIDDEN_TAGS) is not None:
+                    continue
+                text = string.strip()
+                if text:
+                    lines.append(text)
+            self._body_text = '\n'.join(lines)
+        return self._body_text
+
+    def pricing(self):
+        """Structured pricing and capacity from the body text, extracted once"""
+        if self._pricing is None:
+            self._pricing = extract_pricing(self.body_text())
+        return self._pricing
+
+    def embedded_blobs(self):
+        """Parse JSON-LD, __NEXT_DATA__ and window state blobs"""
+        if self._blobs is not None:
+            return self._blobs
+
+        blobs = []
+        for script in self.soup.find_all('script'):
+            content = script.string or script.get_text() or ''
+            if not content.strip():
+                continue
+
+            script_type = (script.get('type') or '').lower()
+            if script_type in ('application/ld+json', 'application/json') or script.get('id') == '__NEXT_DATA__':
+                try:
+                    blobs.append(json.loads(content))
+                except ValueError:
+                    pass
+                continue
+
+            for match in STATE_BLOB_PATTERN.finditer(content):
+                try:
+                    blobs.append(json.loads(match.group(1)))
+                except ValueError:
+                    continue
+
+        self._blobs = blobs
+        return blobs
+
+    def is_listing_node(self, node):
+        """A blob node describing this listing: a listing schema.org @type, or one carrying its id"""
+        types = node.get('@type')
+        types = types if isinstance(types, list) else [types]
+        if any(kind in LISTING_TYPES for kind in types if isinstance(kind, str)):
+            return True
+        if self.listing_id:
+            for key in ID_KEYS:
+                value = node.get(key)
+                if isinstance(value, (str, int)) and str(value).rstrip('/').split('/')[-1] == self.listing_id:
+                    return True
+        return False
+
+    def listing_nodes(self):
+        """Dicts inside the listing's own blob nodes; other nodes (breadcrumbs, site, search) are ignored"""
+        for blob in self.embedded_blobs():
+            for node in walk_json(blob):
+                if self.is_listing_node(node):
+                    yield from walk_json(node)
+
+    def field_from_blobs(self, field):
+        """First usable value for a field found in the listing's blob nodes"""
+        convert = CONVERTERS[field]
+        for node in self.listing_nodes():
+            for key in JSON_KEYS[field]:
+                if key not in node:
+                    continue
+                value = convert(node[key])
+                if not is_empty_value(value):
+                    return value
+        return None
+
+    def coordinates(self):
+        """(latitude, longitude) from the listing's blob nodes, or (None, None)"""
+        for node in self.listing_nodes():
+            for lat_key, lng_key in (('latitude', 'longitude'), ('lat', 'lng'), ('lat', 'lon')):
+                lat, lng = node.get(lat_key), node.get(lng_key)
+                try:
+                    lat, lng = float(lat), float(lng)
+                except (TypeError, ValueError):
+                    continue
+                if -90 <= lat <= 90 and -180 <= lng <= 180:
+                    return lat, lng
+        return None, None
+
+    def ordered_selectors(self, field, selectors):
+        """Selectors in the order the selector cache suggests for this field"""
+        if self.selector_cache is None or field is None:
+            return list(selectors)
+        return self.selector_cache.order(self.template, field, selectors)
+
+    def record_selector(self, field, tried, winner):
+        if self.selector_cache is not None and field is not None:
+            self.selector_cache.record(self.template, field, tried, winner)
+
+    def select(self, selector):
+        try:
+            return self.soup.select(selector)
+        except Exception:
+            return []
+
+    def find_text_with_selector(self, selectors, field=None):
+        """Return (selector, text) for the first selector that has text"""
+        tried = []
+        for selector in self.ordered_selectors(field, selectors):
+            tried.append(selector)
+            elements = self.select(selector)
+            if not elements:
+                continue
+            text = elements[0].get_text(' ', strip=True)
+            if text:
+                self.record_selector(field, tried, selector)
+                return selector, text
+        self.record_selector(field, tried, None)
+        return None, "Not found"
+
+    def find_text_by_multiple_selectors(self, selectors, field=None):
+        """Try multiple CSS selectors until one has text"""
+        return self.find_text_with_selector(selectors, field)[1]
+
+    def get_description(self):
+        """Get venue description"""
+        tried = []
+        for selector in self.ordered_selectors('description', DESCRIPTION_SELECTORS):
+            tried.append(selector)
+            for element in self.select(selector):
+                text = element.get_text(' ', strip=True)
+                if len(text) > 50:  # Substantial description
+                    self.record_selector('description', tried, selector)
+                    return text[:300]
+        self.record_selector('description', tried, None)
+        return "No description found"
+
+    def get_amenities(self):
+        """Find amenities/features list"""
+        # Every selector contributes, so one combined query covers them all
+        amenities = []
+        for element in self.select(', '.join(AMENITY_SELECTORS)):
+            text = element.get_text(' ', strip=True)
+            if text and 3 <= len(text) <= 50:  # Reasonable amenity length
+                amenities.append(text)
+        return list(dict.fromkeys(amenities))[:10]
+
+    def get_photos(self):
+        """Collect gallery image URLs from the static markup"""
+        photos = []
+        tried = []
+        for selector in self.ordered_selectors('photos', PHOTO_SELECTORS):
+            tried.append(selector)
+            images = self.select(selector)
+            if not images:
+                continue
+            for img in images:
+                src = img.get('src') or img.get('data-src')
+                if is_venue_photo_url(src):
+                    photos.append(src)
+            self.record_selector('photos', tried, selector)
+            break  # Use first working selector
+        else:
+            self.record_selector('photos', tried, None)
+        return list(dict.fromkeys(photos + self.get_gallery_photos()))
+
+    def get_gallery_photos(self):
+        """Photos from gallery modal markup the page ships before "View all" is clicked"""
+        tried = []
+        for selector in self.ordered_selectors('gallery_modal', GALLERY_MODAL_SELECTORS):
+            tried.append(selector)
+            photos = [src for src in (img.get('src') or img.get('data-src') for img in self.select(selector))
+                      if is_venue_photo_url(src)]
+            if photos:
+                self.record_selector('gallery_modal', tried, selector)
+                return photos
+        self.record_selector('gallery_modal', tried, None)
+        return []
+
+    def parse(self, listing_url):
+        """Build the same venue_data dict as scrape_single_listing"""
+        if self.template is None:
+            self.template = page_template(listing_url)
+        if self.listing_id is None:
+            self.listing_id = listing_id_from_url(listing_url)
+        dom_fallbacks = {
+            'name': lambda: self.find_text_by_multiple_selectors(NAME_SELECTORS, 'name'),
+            'price_per_hour': lambda: self.pricing()['price_per_hour'],
+            'capacity': lambda: self.pricing()['capacity'],
+            'address': lambda: self.find_text_by_multiple_selectors(ADDRESS_SELECTORS, 'address'),
+            'category': lambda: self.find_text_by_multiple_selectors(CATEGORY_SELECTORS, 'category'),
+            'description': self.get_description,
+            'amenities': self.get_amenities,
+            'photos': self.get_photos,
+            'host_name': lambda: self.find_text_by_multiple_selectors(HOST_SELECTORS, 'host_name'),
+        }
+
+        venue_data = {'url': listing_url}
+        for field, fallback in dom_fallbacks.items():
+            value = self.field_from_blobs(field)
+            if field == 'photos':
+                # Blobs often list only the cover photos, so merge with the markup
+                value = (value or []) + fallback()
+            elif is_empty_value(value):
+                value = fallback()
+            venue_data[field] = value
+
+        if isinstance(venue_data['description'], str):
+            venue_data['description'] = venue_data['description'][:300]
+        venue_data['amenities'] = list(dict.fromkeys(venue_data['amenities']))[:10]
+        # Markup can hold relative src attributes, the browser would resolve them
+        venue_data['photos'] = list(dict.fromkeys(urljoin(listing_url, src) for src in venue_data['photos']))
+        venue_data['pricing'] = self.pricing()
+        venue_data['latitude'], venue_data['longitude'] = self.coordinates()
+        venue_data['raw_page_text'] = self.body_text()[:500]  # For debugging
+        venue_data['photo_count'] = len(venue_data['photos'])
+        return venue_data
+
+
+SNAPSHOT_SCRIPT = (
+    "return {html: document.documentElement.outerHTML, "
+    "text: document.body ? document.body.innerText : ''};"
+)
+
+
+def snapshot_from_driver(driver, selector_cache=None, template=None, listing_id=None):
+    """One browser command: serialized DOM plus rendered body text"""
+    dump = driver.execute_script(SNAPSHOT_SCRIPT)
+    return ListingPageParser(dump['html'], body_text=dump['text'], selector_cache=selector_cache, template=template,
+                             listing_id=listing_id)
+
+
+def parse_listing_html(html, listing_url, selector_cache=None):
+    """Parse one listing page into a venue_data dict"""
+    # Raw HTML differs from the rendered DOM, so its selector stats are kept apart
+    return ListingPageParser(html, selector_cache=selector_cache,
+                             template=page_template(listing_url, 'http')).parse(listing_url)
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+
+# Fields that aren't worth versioning (debug output, derived values)
+UNVERSIONED_FIELDS = {'url', 'raw_page_text', 'photo_count', 'unchanged', 'distance_miles'}
+
+SCRIPT_PATTERN = re.compile(r'<script\b([^>]*)>(.*?)</script>', re.IGNORECASE | re.DOTALL)
+STYLE_PATTERN = re.compile(r'<style\b[^>]*>.*?</style>', re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+DATA_SCRIPT_PATTERN = re.compile(r'application/(?:ld\+)?json|__NEXT_DATA__', re.IGNORECASE)
+# Values that change on every request without the listing changing
+VOLATILE_PATTERN = re.compile(r'"(?:buildId|nonce|csrfToken|requestId|timestamp)"\s*:\s*"[^"]*"')
+
+
+def page_fingerprint(html):
+    """Content hash of a listing page that ignores scripts, markup and per-request noise
+
+    Uses regexes only, so it is much cheaper than parsing the page and can decide
+    whether the parse (and all the photo work) is needed at all.
+    """
+    data_blobs = [VOLATILE_PATTERN.sub('', body)
+                  for attrs, body in SCRIPT_PATTERN.findall(html)
+                  if DATA_SCRIPT_PATTERN.search(attrs)]
+    text = SCRIPT_PATTERN.sub(' ', html)
+    text = STYLE_PATTERN.sub(' ', text)
+    text = TAG_PATTERN.sub(' ', text)
+    text = ' '.join(text.split())
+
+    digest = hashlib.sha256()
+    for blob in data_blobs:
+        digest.update(' '.join(blob.split()).encode('utf-8'))
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ListingStore:
+    """SQLite store of the latest record per listing id, with per-field version history"""
+
+    def __init__(self, path='listings.sqlite'):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")  # Crawl workers in other processes write too
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS listings (
+                listing_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                record_json TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                last_changed REAL NOT NULL,
+                version INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS field_versions (
+                listing_id TEXT NOT NULL,
+                field TEXT NOT NULL,
+                crawled_at REAL NOT NULL,
+                value_json TEXT,
+                PRIMARY KEY (listing_id, field, crawled_at)
+            );
+        """)
+        self.db.commit()
+
+    def get(self, listing_id):
+        """Latest stored record for a listing, or None"""
+        row = self.db.execute("SELECT record_json FROM listings WHERE listing_id = ?", (listing_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def fingerprint(self, listing_id):
+        row = self.db.execute("SELECT fingerprint FROM listings WHERE listing_id = ?", (listing_id,)).fetchone()
+        return row[0] if row else None
+
+    def unchanged_record(self, listing_id, fingerprint):
+        """Stored record if the page fingerprint matches, marking the listing as seen"""
+        row = self.db.execute(
+            "SELECT fingerprint, record_json FROM listings WHERE listing_id = ?", (listing_id,)
+        ).fetchone()
+        if row is None or row[0] != fingerprint:
+            return None
+        self.db.execute("UPDATE listings SET last_seen = ? WHERE listing_id = ?", (time.time(), listing_id))
+        self.db.commit()
+        return json.loads(row[1])
+
+    def save(self, listing_id, venue_data, fingerprint, crawled_at=None):
+        """Store a freshly parsed record, versioning only the fields that changed
+
+        Returns the list of changed field names (every field for a new listing).
+        """
+        crawled_at = crawled_at or time.time()
+        record = {key: value for key, value in venue_data.items() if key != 'unchanged'}
+        previous = self.get(listing_id)
+
+        changed = [field for field in record
+                   if field not in UNVERSIONED_FIELDS
+                   and (previous is None or previous.get(field) != record[field])]
+
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO field_versions VALUES (?, ?, ?, ?)",
+                [(listing_id, field, crawled_at, json.dumps(record[field])) for field in changed]
+            )
+            if previous is None:
+                self.db.execute(
+                    "INSERT INTO listings VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
+                    (listing_id, record.get('url', ''), fingerprint, json.dumps(record),
+                     crawled_at, crawled_at, crawled_at)
+                )
+            else:
+                self.db.execute(
+                    "UPDATE listings SET url = ?, fingerprint = ?, record_json = ?, last_seen = ?, "
+                    "last_changed = CASE WHEN ? THEN ? ELSE last_changed END, "
+                    "version = version + CASE WHEN ? THEN 1 ELSE 0 END WHERE listing_id = ?",
+                    (record.get('url', ''), fingerprint, json.dumps(record), crawled_at,
+                     bool(changed), crawled_at, bool(changed), listing_id)
+                )
+        return changed
+
+    def known_ids(self):
+        """Every listing id in the store"""
+        return {row[0] for row in self.db.execute("SELECT listing_id FROM listings")}
+
+    def field_history(self, listing_id, fields=None):
+        """[(crawled_at, field, value)] for a listing, oldest first"""
+        query = "SELECT crawled_at, field, value_json FROM field_versions WHERE listing_id = ?"
+        params = [listing_id]
+        if fields:
+            query += f" AND field IN ({', '.join('?' for _ in fields)})"
+            params.extend(fields)
+        query += " ORDER BY crawled_at"
+        return [(crawled_at, field, json.loads(value)) for crawled_at, field, value in self.db.execute(query, params)]
+
+    def records(self):
+        """Iterate (listing_id, latest record) over the whole store"""
+        for listing_id, record_json in self.db.execute("SELECT listing_id, record_json FROM listings"):
+            yield listing_id, json.loads(record_json)
+
+    def close(self):
+        self.db.close()
@@ -1,23 +1,137 @@
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 import json
 import time
 import re
 import requests
 import os
-from geopy.distance import geodesic
+from requests.adapters import HTTPAdapter
+from listing_parser import (
+    NAME_SELECTORS, ADDRESS_SELECTORS, CATEGORY_SELECTORS, HOST_SELECTORS,
+    PHOTO_SELECTORS, GALLERY_MODAL_SELECTORS, is_venue_photo_url,
+    FALLBACK_SELECTORS, missing_required_fields, parse_listing_html,
+    snapshot_from_driver, listing_id_from_url
+)
+from wait_policy import WaitPolicy
+from gallery_harvest import harvest_images, record_size, network_photo_urls, find_first
+from photo_downloader import PhotoDownloader, photo_extension, high_res_url
+from photo_store import PhotoStore
+from geo_index import GeocodeCache, RadiusFilter
+from listing_store import ListingStore, page_fingerprint
+from instrumentation import DISABLED, Instrumentation, instrumented
+from selector_cache import SelectorCache, page_template
+from browser_profile import apply_lean_options, apply_lean_blocking
+from discovery import prefetch
+from page_archive import PageArchive
+from scraper_daemon import DEFAULT_PORT, daemon_health, scrape_via_daemon
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+# Registered for every new document, so it survives navigation in long-lived browsers
+STEALTH_SCRIPT = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+GALLERY_BUTTON_SELECTOR = 'button[class*="tw-aspect"] img'
+
+VIEW_ALL_BUTTON_SELECTORS = [
+    '[data-testing-id="photoWithViewAllButton"]',  # Your exact data attribute
+    'div[class*="tw-absolute"] span[data-testing-id="photoWithViewAllButton"]',
+    'span[data-testing-id="photoWithViewAllButton"]',
+]
+
+VIEW_ALL_BUTTON_XPATHS = [
+    "//*[contains(text(), 'View all')]",
+    "//span[contains(text(), 'View all')]",
+    "//div[contains(text(), 'View all')]"
+]
 
 class PeerspaceListingScraper:
-    def __init__(self, headless=False):
+    def __init__(self, headless=False, use_http=False, http_timeout=15, wait_timeouts=None,
+                 gallery_network_log=True, download_photos=False, photo_store_dir='photo_store',
+                 listing_store_path=None, instrument=False, trace_path=None,
+                 selector_cache_path='selector_cache.json', lean=False, browser_cache_dir='browser_cache',
+                 page_archive_dir='page_archive', daemon_port=None):
         self.target_location = (34.0627, -118.1834)  # 5464 E Valley Blvd
         self.max_distance = 5  # miles
         self.venues_data = []
         self.driver = None
         self.headless = headless
-        
+        self.lean = lean  # Block images, media, fonts and trackers; photos are downloaded from their URLs
+        self.browser_cache_dir = browser_cache_dir  # Disk cache kept across lean driver restarts
+        self.use_http = use_http  # Try the browserless fast path first
+        self.http_timeout = http_timeout
+        self.session = None
+        self.snapshot = None  # DOM copy of the current listing, see get_snapshot
+        self.gallery_network_log = gallery_network_log  # Also harvest photo URLs from resource timings
+        self.download_photos = download_photos  # Download each listing's photos right after scraping
+        self.downloader = None
+        self.photo_store_dir = photo_store_dir  # Content-addressed photo store, None writes plain files
+        self.photo_store = None
+        # Latest record + fingerprint per listing so unchanged pages are skipped on recrawl
+        self.listing_store = ListingStore(listing_store_path) if listing_store_path else None
+        self.page_fingerprint = None
+        # Stage spans, WebDriver/HTTP counters and a JSON-lines trace; a no-op unless enabled
+        self.instrumentation = Instrumentation(trace_path=trace_path) if (instrument or trace_path) else DISABLED
+        # Readiness waits instead of fixed sleeps
+        self.wait_policy = WaitPolicy(wait_timeouts, instrumentation=self.instrumentation)
+        # Which selector matched each field last time, per page template
+        self.selector_cache = (SelectorCache(selector_cache_path, fallback=FALLBACK_SELECTORS)
+                               if selector_cache_path else None)
+        self.template = None
+        self.listing_id = None  # Current listing, picks its node out of the page's JSON blobs
+        # Compressed copy of every fetched page so extractors can be rerun offline, None disables
+        self.page_archive_dir = page_archive_dir
+        self.page_archive = None
+        self.fetched_at = None
+        # Port of a running scraper_daemon.py to hand single-listing tests to, skips the browser boot
+        self.daemon_port = daemon_port
+
+    def radius_filter(self, max_miles=None, geocode_cache_path='geocode_cache.json'):
+        """Filter for listings within max_miles (default max_distance) of target_location"""
+        return RadiusFilter(self.target_location, max_miles or self.max_distance, GeocodeCache(geocode_cache_path))
+
+    def setup_http_session(self):
+        """Pooled HTTP session reused for every listing fetch"""
+        if self.session is None:
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=2)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+            self.session.headers.update(BROWSER_HEADERS)
+            self.instrumentation.wrap_session(self.session)
+        return self.session
+
+    @instrumented('http_fetch_parse')
+    def scrape_listing_http(self, listing_url):
+        """Fetch and parse a listing without a browser, None if fields are missing"""
+        try:
+            print(f"⚡ Fetching over HTTP: {listing_url}")
+            response = self.setup_http_session().get(listing_url, timeout=self.http_timeout)
+            self.fetched_at = time.time()
+            if response.status_code != 200:
+                print(f"❌ HTTP fetch failed: Status {response.status_code}")
+                return None
+
+            self.archive_page(listing_url, html=response.text)
+
+            cached = self.check_unchanged(listing_url, response.text)
+            if cached:
+                return cached
+
+            venue_data = parse_listing_html(response.text, listing_url, self.selector_cache)
+            missing = missing_required_fields(venue_data)
+            if missing:
+                print(f"⚠️ HTTP parse missing {missing}, falling back to Selenium")
+                return None
+
+            return venue_data
+        except Exception as e:
+            print(f"❌ HTTP fast path failed: {e}")
+            return None
+
     def setup_driver(self):
         """Set up Chrome driver"""
         chrome_options = Options()
@@ -30,69 +144,109 @@ class PeerspaceListingScraper:
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
         
+        if self.lean:
+            apply_lean_options(chrome_options, self.browser_cache_dir)
+        
         try:
             self.driver = webdriver.Chrome(options=chrome_options)
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            self.instrumentation.wrap_driver(self.driver)
+            try:
+                self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': STEALTH_SCRIPT})
+            except Exception:
+                self.driver.execute_script(STEALTH_SCRIPT)
+            if self.lean:
+                try:
+                    apply_lean_blocking(self.driver)
+                except Exception as e:
+                    print(f"⚠️ Request blocking unavailable, relying on prefs: {e}")
             print("✅ Chrome driver ready")
             return True
         except Exception as e:
             print(f"❌ Chrome setup failed: {e}")
             return False
 
+    def driver_alive(self):
+        """Cheap health check: does the browser still answer commands?"""
+        try:
+            return self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def quit_driver(self):
+        """Shut the browser down so the next listing starts a fresh one"""
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"⚠️ Driver quit failed: {e}")
+            self.driver = None
+            self.snapshot = None
+
+    def close(self):
+        """Release the browser and any pooled HTTP connections"""
+        self.quit_driver()
+        if self.session:
+            self.session.close()
+            self.session = None
+        if self.downloader:
+            self.downloader.close()
+            self.downloader = None
+        if self.photo_store:
+            self.photo_store.close()
+            self.photo_store = None
+        if self.listing_store:
+            self.listing_store.close()
+            self.listing_store = None
+        if self.selector_cache:
+            self.selector_cache.save()
+        if self.page_archive:
+            self.page_archive.close()
+            self.page_archive = None
+        self.instrumentation.close()
+
+    @instrumented('gallery.click')
     def click_view_all_photos_button(self):
         """Click the 'View all' button to open full photo gallery"""
         try:
             print("🔍 Looking for 'View all' photos button...")
             
-            # Multiple ways to find the button
-            button_selectors = [
-                '[data-testing-id="photoWithViewAllButton"]',  # Your exact data attribute
-                'div[class*="tw-absolute"] span[data-testing-id="photoWithViewAllButton"]',
-                'span[data-testing-id="photoWithViewAllButton"]',
-            ]
-            
-            # Also try XPath for text-based search
-            xpath_selectors = [
-                "//*[contains(text(), 'View all')]",
-                "//span[contains(text(), 'View all')]",
-                "//div[contains(text(), 'View all')]"
-            ]
-            
-            # Try CSS selectors first
-            for selector in button_selectors:
+            # Multiple ways to find the button: CSS first, then text-based XPath
+            candidates = [('css', selector) for selector in VIEW_ALL_BUTTON_SELECTORS]
+            candidates += [('xpath', xpath) for xpath in VIEW_ALL_BUTTON_XPATHS]
+            
+            # Last winning selector first, every other candidate checked in the same browser command
+            ordered = self.ordered_selectors('view_all', [selector for _, selector in candidates])
+            kinds = {selector: kind for kind, selector in candidates}
+            remaining = [(kinds[selector], selector) for selector in ordered]
+            tried = []
+            
+            while remaining:
+                index, button = find_first(self.driver, remaining)
+                if index is None:
+                    tried += [selector for _, selector in remaining]
+                    break
+                
+                kind, selector = remaining[index]
+                tried += [selector for _, selector in remaining[:index + 1]]
+                remaining = remaining[index + 1:]
                 try:
-                    button = self.driver.find_element(By.CSS_SELECTOR, selector)
                     print(f"✅ Found 'View all' button with: {selector}")
                     
                     # Scroll button into view and click
                     self.driver.execute_script("arguments[0].scrollIntoView(true);", button)
-                    time.sleep(1)
+                    self.wait_policy.button_clickable(self.driver, button)
                     
                     # Try clicking
                     button.click()
                     print("✅ Clicked 'View all' button!")
-                    time.sleep(3)  # Wait for gallery to open
-                    return True
-                    
-                except Exception as e:
-                    continue
-            
-            # Try XPath selectors
-            for xpath in xpath_selectors:
-                try:
-                    button = self.driver.find_element(By.XPATH, xpath)
-                    print(f"✅ Found 'View all' button with XPath")
-                    
-                    self.driver.execute_script("arguments[0].scrollIntoView(true);", button)
-                    time.sleep(1)
-                    button.click()
-                    print("✅ Clicked 'View all' button!")
-                    time.sleep(3)
+                    self.record_selector('view_all', tried, selector)
+                    self.wait_policy.gallery_open(self.driver, GALLERY_MODAL_SELECTORS, visible=not self.lean)
                     return True
                     
                 except Exception as e:
                     continue
             
+            self.record_selector('view_all', tried, None)
             print("❌ Could not find 'View all' button")
             return False
             
@@ -100,54 +254,52 @@ class PeerspaceListingScraper:
             print(f"❌ Error clicking view all button: {e}")
             return False
 
+    @instrumented('gallery.harvest')
     def get_gallery_photos_after_click(self):
         """Get photos from the opened gallery modal"""
         try:
             print("📸 Extracting photos from opened gallery...")
             
-            # After clicking "View all", photos might be in a modal/overlay
-            gallery_modal_selectors = [
-                '.modal img',
-                '.overlay img', 
-                '.gallery-modal img',
-                '.lightbox img',
-                '[role="dialog"] img',
-                '.tw-fixed img',  # Tailwind fixed positioning (modal)
-                'div[class*="tw-fixed"] img',
-                '.carousel img',
-                '.slider img'
-            ]
+            # Lazy-loaded galleries keep adding images for a moment after opening
+            self.wait_policy.images_stable(self.driver, ', '.join(GALLERY_MODAL_SELECTORS), loaded_only=not self.lean)
+            
+            # One script call for every candidate image, filters run locally
+            selectors = GALLERY_MODAL_SELECTORS + [GALLERY_BUTTON_SELECTOR]
+            groups, resources = harvest_images(self.driver, selectors, with_resources=self.gallery_network_log)
             
             venue_photos = []
+            modal_groups = dict(zip(GALLERY_MODAL_SELECTORS, groups))
+            tried = []
+            
+            for selector in self.ordered_selectors('gallery_modal', GALLERY_MODAL_SELECTORS):
+                tried.append(selector)
+                images = modal_groups[selector]
+                if images:
+                    print(f"🎯 Found {len(images)} images in modal: {selector}")
+                    
+                    for img in images:
+                        src = img['src']
+                        if src and self.is_venue_photo_in_modal(src, img):
+                            venue_photos.append(src)
+                    
+                    if venue_photos:
+                        break  # Use first working modal selector
             
-            for selector in gallery_modal_selectors:
-                try:
-                    images = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if images:
-                        print(f"🎯 Found {len(images)} images in modal: {selector}")
-                        
-                        for img in images:
-                            src = img.get_attribute('src')
-                            if src and self.is_venue_photo_in_modal(src, img):
-                                venue_photos.append(src)
-                        
-                        if venue_photos:
-                            break  # Use first working modal selector
-                            
-                except:
-                    continue
+            self.record_selector('gallery_modal', tried, tried[-1] if venue_photos else None)
             
             # If no modal photos, try original button method
             if not venue_photos:
                 print("📸 No modal photos, trying button images...")
-                button_images = self.driver.find_elements(By.CSS_SELECTOR, 'button[class*="tw-aspect"] img')
-                
-                for img in button_images:
-                    src = img.get_attribute('src')
+                for img in groups[-1]:
+                    src = img['src']
                     if src and self.is_venue_photo_in_modal(src, img):
                         venue_photos.append(src)
             
-            unique_photos = list(set(venue_photos))
+            # Slides the carousel already unloaded still show up in the network log
+            if venue_photos and resources:
+                venue_photos += network_photo_urls(resources, venue_photos, is_venue_photo_url)
+            
+            unique_photos = list(dict.fromkeys(venue_photos))
             print(f"📷 Total venue photos collected: {len(unique_photos)}")
             return unique_photos
             
@@ -155,14 +307,13 @@ class PeerspaceListingScraper:
             print(f"❌ Gallery extraction error: {e}")
             return []
 
-    def is_venue_photo_in_modal(self, src, img_element):
-        """Check if image in modal/gallery is a venue photo"""
+    def is_venue_photo_in_modal(self, src, img):
+        """Check if image in modal/gallery is a venue photo (img is a harvested record)"""
         try:
             # Skip tiny images
-            width = img_element.size['width']
-            height = img_element.size['height']
+            width, height = record_size(img)
             
-            if width < 150 or height < 100:
+            if not self.size_unknown(img) and (width < 150 or height < 100):
                 return False
             
             # Skip non-venue images
@@ -174,6 +325,7 @@ class PeerspaceListingScraper:
         except:
             return True
 
+    @instrumented('gallery')
     def get_photos_with_view_all_click(self):
         """Main photo extraction with 'View all' button click"""
         try:
@@ -193,39 +345,38 @@ class PeerspaceListingScraper:
             print(f"❌ Photo extraction failed: {e}")
             return []
 
+    @instrumented('gallery.inline')
     def get_venue_photos_real_selectors(self):
         """Use the REAL selectors you discovered"""
         try:
             venue_photos = []
             
-            # Your discovered pattern - photos in buttons
-            real_selectors = [
-                'button[class*="tw-aspect"] img',  # General pattern
-                'button span img',  # Simplified version
-                'button img'  # Even simpler
-            ]
+            # Your discovered pattern - photos in buttons, all fetched in one call
+            groups, _ = harvest_images(self.driver, PHOTO_SELECTORS)
+            photo_groups = dict(zip(PHOTO_SELECTORS, groups))
+            tried = []
+            winner = None
             
-            for selector in real_selectors:
-                try:
-                    print(f"🔍 Trying selector: {selector}")
-                    images = self.driver.find_elements(By.CSS_SELECTOR, selector)
+            for selector in self.ordered_selectors('photos', PHOTO_SELECTORS):
+                print(f"🔍 Trying selector: {selector}")
+                tried.append(selector)
+                images = photo_groups[selector]
+                
+                if images:
+                    print(f"✅ Found {len(images)} images with: {selector}")
                     
-                    if images:
-                        print(f"✅ Found {len(images)} images with: {selector}")
-                        
-                        for img in images:
-                            src = img.get_attribute('src')
-                            if src and self.is_high_quality_venue_photo(src, img):
-                                venue_photos.append(src)
-                        
-                        break  # Use first working selector
-                        
-                except Exception as e:
-                    print(f"❌ Selector failed: {selector} - {e}")
-                    continue
+                    for img in images:
+                        src = img['src']
+                        if src and self.is_high_quality_venue_photo(src, img):
+                            venue_photos.append(src)
+                    
+                    winner = selector
+                    break  # Use first working selector
+            
+            self.record_selector('photos', tried, winner)
             
             # Remove duplicates
-            unique_photos = list(set(venue_photos))
+            unique_photos = list(dict.fromkeys(venue_photos))
             print(f"📷 Found {len(unique_photos)} unique venue photos")
             
             return unique_photos
@@ -234,15 +385,18 @@ class PeerspaceListingScraper:
             print(f"❌ Photo extraction error: {e}")
             return []
 
-    def is_high_quality_venue_photo(self, src, img_element):
-        """Better photo filtering using your insights"""
+    def size_unknown(self, img):
+        """Lean mode never downloads images, so unloaded ones have no real size to filter on"""
+        return self.lean and not img.get('natural_width')
+
+    def is_high_quality_venue_photo(self, src, img):
+        """Better photo filtering using your insights (img is a harvested record)"""
         try:
             # Get actual displayed size
-            width = img_element.size['width']
-            height = img_element.size['height']
+            width, height = record_size(img)
             
             # Skip tiny images (likely icons/logos)
-            if width < 100 or height < 100:
+            if not self.size_unknown(img) and (width < 100 or height < 100):
                 return False
             
             # Skip obvious non-venue images
@@ -253,76 +407,117 @@ class PeerspaceListingScraper:
                 return False
             
             # Check if parent button suggests it's a gallery image
-            try:
-                parent_button = img_element.find_element(By.XPATH, "./..")  # Parent element
-                parent_class = parent_button.get_attribute('class') or ""
-                
-                # Good signs it's a gallery photo
-                if any(keyword in parent_class.lower() for keyword in ['aspect', 'gallery', 'carousel']):
-                    return True
-            except:
-                pass
+            parent_class = img.get('parent_class') or ""
+            
+            # Good signs it's a gallery photo
+            if any(keyword in parent_class.lower() for keyword in ['aspect', 'gallery', 'carousel']):
+                return True
             
             # If reasonably large, probably a venue photo
-            return width >= 200 and height >= 150
+            return self.size_unknown(img) or (width >= 200 and height >= 150)
             
         except:
             return True  # When in doubt, include it
 
+    @instrumented('listing')
     def scrape_single_listing(self, listing_url):
         """Scrape one listing page - perfect for testing"""
         try:
+            if self.use_http:
+                venue_data = self.scrape_listing_http(listing_url)
+                if venue_data:
+                    return self.finish_listing(venue_data)
+
+            if self.driver is None and not self.setup_driver():
+                return None
+
             print(f"🏠 Loading: {listing_url}")
             self.driver.get(listing_url)
+            self.fetched_at = time.time()
+            self.snapshot = None
+            self.template = page_template(listing_url)
+            self.listing_id = listing_id_from_url(listing_url)
             
-            # Wait for page to load
-            time.sleep(5)
+            # Wait for page content instead of a fixed delay
+            self.wait_policy.page_ready(self.driver)
+            
+            snapshot = self.get_snapshot()
+            self.archive_page(listing_url, html=snapshot.html, text=snapshot.body_text())
+
+            # Skip extraction and gallery work if the page hasn't changed since the last crawl
+            cached = self.check_unchanged(listing_url, snapshot.html)
+            if cached:
+                return self.finish_listing(cached)
             
             # Extract all the data
             venue_data = {
                 'url': listing_url,
-                'name': self.find_text_by_multiple_selectors([
-                    'h1',
-                    '[data-testid*="title"]',
-                    '.listing-title',
-                    '.space-title'
-                ]),
+                'name': self.find_text_by_multiple_selectors(NAME_SELECTORS, 'name'),
                 'price_per_hour': self.extract_price_from_page(),
                 'capacity': self.extract_capacity_from_page(),
-                'address': self.find_text_by_multiple_selectors([
-                    '.location-text',
-                    '.neighborhood',
-                    '[class*="address"]',
-                    '[class*="location"]',
-                    'span:contains("Los Angeles")',
-                    'div:contains("CA")'
-                ]),
-                'category': self.find_text_by_multiple_selectors([
-                    '.space-type',
-                    '.listing-type', 
-                    '[class*="category"]',
-                    '.tag',
-                    '.badge',
-                    'span[class*="type"]'
-                ]),
+                'address': self.find_text_by_multiple_selectors(ADDRESS_SELECTORS, 'address'),
+                'category': self.find_text_by_multiple_selectors(CATEGORY_SELECTORS, 'category'),
                 'description': self.get_description(),
                 'amenities': self.get_amenities(),
                 'photos': self.get_photos_with_view_all_click(),
-                'host_name': self.find_text_by_multiple_selectors([
-                    '[data-testid*="host"]',
-                    '.host-name',
-                    '[class*="host"]'
-                ]),
-                'raw_page_text': self.driver.find_element(By.TAG_NAME, "body").text[:500]  # For debugging
+                'host_name': self.find_text_by_multiple_selectors(HOST_SELECTORS, 'host_name'),
+                'pricing': self.get_snapshot().pricing(),  # Minimum hours, other rates, fees, capacity tiers
+                'raw_page_text': self.get_snapshot().body_text()[:500]  # For debugging
             }
             
             venue_data['photo_count'] = len(venue_data['photos'])
+            # Same as the HTTP parse, so the radius filter learns browser-scraped listings too
+            venue_data['latitude'], venue_data['longitude'] = self.get_snapshot().coordinates()
+            # Clicked-through gallery photos aren't in the page source, keep them for re-extraction
+            self.archive_page(listing_url, gallery=venue_data['photos'])
+            
+            return self.finish_listing(venue_data)
+            
+        except Exception as e:
+            print(f"❌ Error scraping {listing_url}: {e}")
+            return None
+
+    def archive_page(self, listing_url, **contents):
+        """Append this fetch's html/text/gallery to the page archive"""
+        if not self.page_archive_dir:
+            return
+        try:
+            if self.page_archive is None:
+                self.page_archive = PageArchive(self.page_archive_dir)
+            with self.instrumentation.span('archive'):
+                for kind, content in contents.items():
+                    self.page_archive.add(listing_id_from_url(listing_url), listing_url, kind, content, self.fetched_at)
+        except Exception as e:
+            print(f"⚠️ Page archive failed for {listing_url}: {e}")
+
+    def check_unchanged(self, listing_url, html):
+        """Stored record if this page's fingerprint matches the last crawl, else None"""
+        self.page_fingerprint = None
+        if not self.listing_store:
+            return None
+        
+        self.page_fingerprint = page_fingerprint(html)
+        record = self.listing_store.unchanged_record(listing_id_from_url(listing_url), self.page_fingerprint)
+        if record is None:
+            return None
+        
+        record['unchanged'] = True
+        return record
+
+    def finish_listing(self, venue_data):
+        """Download photos if enabled and print a summary for a scraped listing"""
+        try:
+            if venue_data.get('unchanged'):
+                print(f"♻️ Unchanged since last crawl: {venue_data['name']}")
+                return venue_data
+            
+            if self.listing_store and self.page_fingerprint:
+                changed = self.listing_store.save(listing_id_from_url(venue_data['url']), venue_data, self.page_fingerprint)
+                print(f"💾 Stored {len(changed)} changed fields")
             
             # Optionally download photos
-            if venue_data['photos']:
-                download_choice = input(f"Download {len(venue_data['photos'])} photos for '{venue_data['name']}'? (y/n): ")
-                if download_choice.lower() == 'y':
-                    self.download_venue_photos(venue_data['photos'], venue_data['name'])
+            if self.download_photos and venue_data['photos']:
+                self.download_venue_photos(venue_data['photos'], venue_data['name'], venue_data['url'])
             
             print(f"✅ Scraped: {venue_data['name']}")
             print(f"   Price: ${venue_data['price_per_hour']}/hr")
@@ -332,179 +527,194 @@ class PeerspaceListingScraper:
             return venue_data
             
         except Exception as e:
-            print(f"❌ Error scraping {listing_url}: {e}")
-            return None
+            print(f"❌ Error finishing {venue_data.get('url')}: {e}")
+            return venue_data
+
+    def get_snapshot(self):
+        """Capture the page once per listing so extractors don't hit the browser"""
+        if self.snapshot is None:
+            with self.instrumentation.span('snapshot'):
+                self.snapshot = snapshot_from_driver(self.driver, self.selector_cache, self.template, self.listing_id)
+        return self.snapshot
 
-    def find_text_by_multiple_selectors(self, selectors):
+    def ordered_selectors(self, field, selectors):
+        """Selectors in the order the selector cache suggests for this page template"""
+        if self.selector_cache is None:
+            return list(selectors)
+        return self.selector_cache.order(self.template, field, selectors)
+
+    def record_selector(self, field, tried, winner):
+        if self.selector_cache is not None:
+            self.selector_cache.record(self.template, field, tried, winner)
+
+    @instrumented('extract.text')
+    def find_text_by_multiple_selectors(self, selectors, field=None):
         """Try multiple CSS selectors until one works"""
-        for selector in selectors:
-            try:
-                element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                text = element.text.strip()
-                if text:
-                    print(f"✅ Found with selector '{selector}': {text[:50]}")
-                    return text
-            except:
-                continue
+        selector, text = self.get_snapshot().find_text_with_selector(selectors, field)
+        if selector:
+            print(f"✅ Found with selector '{selector}': {text[:50]}")
+            return text
         
         print(f"❌ No text found with any selector: {selectors}")
         return "Not found"
 
+    @instrumented('extract.price')
     def extract_price_from_page(self):
-        """Look for any dollar amounts on the page"""
+        """Best-ranked hourly rate on the page"""
         try:
-            page_text = self.driver.find_element(By.TAG_NAME, "body").text
-            
-            # Look for common price patterns
-            price_patterns = [
-                r'\$(\d+)(?:/hour|/hr|per hour)',
-                r'\$(\d+)',  # Any dollar amount
-                r'(\d+)\s*(?:USD|dollars?)(?:/hour|/hr|per hour)?'
-            ]
-            
-            for pattern in price_patterns:
-                matches = re.findall(pattern, page_text, re.IGNORECASE)
-                for match in matches:
-                    price = int(match)
-                    if 10 <= price <= 2000:  # Reasonable hourly rate
-                        print(f"💰 Found price: ${price}")
-                        return price
+            price = self.get_snapshot().pricing()['price_per_hour']
+            if price is not None:
+                print(f"💰 Found price: ${price}")
+                return price
             
             print("❌ No price found")
             return None
         except:
             return None
 
+    @instrumented('extract.capacity')
     def extract_capacity_from_page(self):
         """Look for capacity info"""
         try:
-            page_text = self.driver.find_element(By.TAG_NAME, "body").text
-            
-            capacity_patterns = [
-                r'up to (\d+) (?:people|guests)',
-                r'capacity:?\s*(\d+)',
-                r'(\d+)\s*(?:people|guests|persons)'
-            ]
-            
-            for pattern in capacity_patterns:
-                matches = re.findall(pattern, page_text, re.IGNORECASE)
-                for match in matches:
-                    capacity = int(match)
-                    if 1 <= capacity <= 500:
-                        print(f"👥 Found capacity: {capacity}")
-                        return capacity
+            capacity = self.get_snapshot().pricing()['capacity']
+            if capacity is not None:
+                print(f"👥 Found capacity: {capacity}")
+                return capacity
             
             print("❌ No capacity found")
             return None
         except:
             return None
 
+    @instrumented('extract.description')
     def get_description(self):
         """Get venue description"""
-        desc_selectors = [
-            '[data-testid*="description"]',
-            '.description',
-            '.about',
-            '.details p',
-            'p'
-        ]
-        
-        for selector in desc_selectors:
-            try:
-                elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                for element in elements:
-                    text = element.text.strip()
-                    if len(text) > 50:  # Substantial description
-                        return text[:300]  # First 300 chars
-            except:
-                continue
-        
-        return "No description found"
+        return self.get_snapshot().get_description()
 
+    @instrumented('extract.amenities')
     def get_amenities(self):
         """Find amenities/features list"""
-        amenities = []
-        
-        amenity_selectors = [
-            '.amenity',
-            '.feature',
-            '.amenities li',
-            '[data-testid*="amenity"]',
-            '.facilities li',
-            'li'
-        ]
+        return self.get_snapshot().get_amenities()
+
+    def get_downloader(self):
+        """Shared concurrent downloader, created on first use"""
+        if self.downloader is None:
+            if self.photo_store_dir and self.photo_store is None:
+                self.photo_store = PhotoStore(self.photo_store_dir)
+            self.downloader = PhotoDownloader(store=self.photo_store, instrumentation=self.instrumentation)
+        return self.downloader
+
+    def venue_folder(self, venue_name, venue_url=None):
+        """Folder for a venue's photos, suffixed with the listing id so names can't collide"""
+        safe_name = re.sub(r'[^\w\s-]', '', venue_name or '')[:30].strip()
+        folder_name = f"venue_photos_{safe_name}"
+        if venue_url:
+            folder_name += f"_{listing_id_from_url(venue_url)[:12]}"
+        return safe_name, folder_name
+
+    def photo_jobs(self, photo_urls, venue_name, venue_url=None):
+        """(url, path) download jobs with the usual folder and file naming"""
+        # Create clean folder name
+        safe_name, folder_name = self.venue_folder(venue_name, venue_url)
         
-        for selector in amenity_selectors:
-            try:
-                elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                for element in elements:
-                    text = element.text.strip()
-                    if text and 3 <= len(text) <= 50:  # Reasonable amenity length
-                        amenities.append(text)
-            except:
-                continue
+        jobs = []
+        for i, url in enumerate(photo_urls):
+            # Get high-res version of image
+            clean_url = self.get_high_res_url(url)
+            filename = f"{folder_name}/{safe_name}_photo_{i+1:02d}{photo_extension(clean_url)}"
+            jobs.append((clean_url, filename))
+        return jobs
+
+    def run_downloads(self, jobs):
+        """Run download jobs through the pool and print each result"""
+        results = []
+        for result in self.get_downloader().iter_batch(jobs):
+            if result['error']:
+                print(f"❌ Failed download {result['url']}: {result['error']}")
+            elif result['cached']:
+                print(f"♻️ Unchanged: {result['path']}")
+            else:
+                print(f"✅ Downloaded: {result['path']} ({result['bytes']} bytes)")
+            results.append(result)
         
-        return list(set(amenities))[:10]  # First 10 unique amenities
+        if self.photo_store:
+            self.write_venue_manifests(results)
+        return results
+
+    def write_venue_manifests(self, results):
+        """One manifest.json per venue folder mapping files to URLs and stored objects"""
+        folders = {}
+        for result in results:
+            if result['error'] is None:
+                folders.setdefault(os.path.dirname(result['path']), []).append({
+                    'file': os.path.basename(result['path']),
+                    'url': result['url'],
+                    'content_hash': result['content_hash'],
+                    'object': result.get('object_path'),
+                })
+        for folder, entries in folders.items():
+            entries.sort(key=lambda entry: entry['file'])
+            self.photo_store.write_manifest(folder, os.path.basename(folder), entries)
 
-    def download_venue_photos(self, photo_urls, venue_name):
+    @instrumented('download.venue')
+    def download_venue_photos(self, photo_urls, venue_name, venue_url=None):
         """Download photos with better naming"""
         if not photo_urls:
             print("No photos to download")
-            return
-        
-        # Create clean folder name
-        safe_name = re.sub(r'[^\w\s-]', '', venue_name)[:30].strip()
-        folder_name = f"venue_photos_{safe_name}"
-        os.makedirs(folder_name, exist_ok=True)
+            return []
         
-        print(f"📁 Downloading {len(photo_urls)} photos to: {folder_name}")
+        jobs = self.photo_jobs(photo_urls, venue_name, venue_url)
+        print(f"📁 Downloading {len(jobs)} photos to: {os.path.dirname(jobs[0][1])}")
+        return self.run_downloads(jobs)
+
+    @instrumented('download.batch')
+    def download_photos_for_venues(self, venues):
+        """Batch download photos for many scraped venues through one pool"""
+        jobs = []
+        for venue in venues:
+            if venue and venue.get('photos'):
+                jobs.extend(self.photo_jobs(venue['photos'], venue.get('name'), venue.get('url')))
         
-        for i, url in enumerate(photo_urls):
-            try:
-                # Get high-res version of image
-                clean_url = self.get_high_res_url(url)
-                
-                response = requests.get(clean_url, timeout=15)
-                if response.status_code == 200:
-                    # Better filename
-                    ext = '.jpg'
-                    if '.' in clean_url:
-                        ext = '.' + clean_url.split('.')[-1].split('?')[0]
-                    
-                    filename = f"{folder_name}/{safe_name}_photo_{i+1:02d}{ext}"
-                    
-                    with open(filename, 'wb') as f:
-                        f.write(response.content)
-                    
-                    print(f"✅ Downloaded: {filename}")
-                else:
-                    print(f"❌ Failed download {i+1}: Status {response.status_code}")
-                
-                time.sleep(1)  # Be nice to servers
-                
-            except Exception as e:
-                print(f"❌ Error downloading photo {i+1}: {e}")
+        print(f"📁 Downloading {len(jobs)} photos for {len(venues)} venues")
+        return self.run_downloads(jobs)
+
+    def scrape_listings(self, listings, queue_size=50):
+        """Scrape listing URLs (or discovery dicts) while discovery keeps paging in the background"""
+        for listing in prefetch(listings, queue_size):
+            url = listing['url'] if isinstance(listing, dict) else listing
+            venue_data = self.scrape_single_listing(url)
+            if venue_data:
+                self.venues_data.append(venue_data)
+                yield venue_data
 
     def get_high_res_url(self, url):
         """Convert thumbnail URL to high-res version"""
-        if not url:
-            return url
-        
-        # Remove common thumbnail parameters
-        clean_url = re.sub(r'[?&]w=\d+', '', url)
-        clean_url = re.sub(r'[?&]h=\d+', '', clean_url)
-        clean_url = re.sub(r'/w_\d+,h_\d+/', '/', clean_url)
-        clean_url = re.sub(r'_thumb\.', '.', clean_url)
-        
-        return clean_url
+        return high_res_url(url)
+
+    def scrape_with_daemon(self, venue_url):
+        """Scrape through a running warm-browser daemon, None if there isn't one"""
+        if not self.daemon_port or daemon_health(port=self.daemon_port) is None:
+            return None
+        print(f"🔥 Using warm browser daemon on port {self.daemon_port}")
+        try:
+            for result in scrape_via_daemon([venue_url], port=self.daemon_port):
+                if result['error']:
+                    print(f"❌ Daemon scrape failed: {result['error']}")
+                return result['data']
+        except (requests.RequestException, ValueError) as e:
+            print(f"❌ Daemon request failed, scraping locally: {e}")
+        return None
 
     def test_single_venue(self, venue_url):
         """Test scraping one venue"""
-        if not self.setup_driver():
-            return None
-        
         try:
-            venue_data = self.scrape_single_listing(venue_url)
+            venue_data = self.scrape_with_daemon(venue_url)
+            # With the HTTP fast path the browser is only started on fallback
+            if venue_data is None and not self.use_http and not self.setup_driver():
+                return None
+            
+            if venue_data is None:
+                venue_data = self.scrape_single_listing(venue_url)
             
             if venue_data:
                 # Save test result
@@ -514,11 +724,12 @@ class PeerspaceListingScraper:
             
             return venue_data
         finally:
-            self.driver.quit()
+            self.wait_policy.print_summary()
+            self.close()
 
 # Test with your example URL
 if __name__ == "__main__":
-    scraper = PeerspaceListingScraper(headless=False)
+    scraper = PeerspaceListingScraper(headless=False, use_http=True, daemon_port=DEFAULT_PORT)
     
     # Test with the URL you found
     test_url = "https://www.peerspace.com/pages/listings/635ca870ab68cd000ef37bf1"
@@ -0,0 +1,269 @@
+import argparse
+import json
+
+import numpy as np
+from scipy import sparse
+
+from listing_parser import listing_id_from_url
+
+SECONDS_PER_DAY = 86400
+MISSING_TEXT = ('', 'Not found', None)
+
+
+class FeatureMatrix:
+    """Venue-by-feature matrix: dense numeric columns plus sparse one-hot blocks"""
+
+    def __init__(self, ids, numeric, numeric_names, categories, category_names, amenities, amenity_names):
+        self.ids = ids
+        self.numeric = numeric              # (venues, k) float64, NaN where missing
+        self.numeric_names = numeric_names
+        self.categories = categories        # (venues, categories) CSR one-hot
+        self.category_names = category_names
+        self.amenities = amenities          # (venues, amenities) CSR one-hot
+        self.amenity_names = amenity_names
+
+    def column(self, name):
+        return self.numeric[:, self.numeric_names.index(name)]
+
+    def price(self):
+        return self.column('price_per_hour')
+
+    def take(self, rows):
+        """FeatureMatrix restricted to the given row indices"""
+        rows = np.asarray(rows, dtype=np.int64)
+        return FeatureMatrix([self.ids[i] for i in rows], self.numeric[rows], self.numeric_names,
+                             self.categories[rows], self.category_names, self.amenities[rows], self.amenity_names)
+
+
+def drop_duplicates(features, clusters):
+    """Keep one listing per near-duplicate cluster (the first one present), so a venue counts once"""
+    drop = set()
+    present = set(features.ids)
+    for members in clusters:
+        members = [listing_id for listing_id in members if listing_id in present]
+        drop.update(members[1:])
+    return features.take([i for i, listing_id in enumerate(features.ids) if listing_id not in drop])
+
+
+def one_hot(codes, width):
+    """CSR one-hot from a code per row (-1 rows stay empty)"""
+    codes = np.asarray(codes)
+    rows = np.nonzero(codes >= 0)[0]
+    data = np.ones(len(rows), dtype=np.float32)
+    return sparse.csr_matrix((data, (rows, codes[rows])), shape=(len(codes), width))
+
+
+def numeric_block(price, capacity):
+    """price_per_hour, capacity and price per head as float columns"""
+    price = np.asarray(price, dtype=np.float64)
+    capacity = np.asarray(capacity, dtype=np.float64)
+    capacity = np.where(capacity > 0, capacity, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        per_head = price / capacity
+    return np.column_stack([price, capacity, per_head]), ['price_per_hour', 'capacity', 'price_per_head']
+
+
+def build_feature_matrix(records):
+    """FeatureMatrix from scrape_single_listing dicts (or ListingStore records)"""
+    records = list(records)
+    ids = [listing_id_from_url(record['url']) for record in records]  # Same ids as snapshots and duplicate clusters
+
+    price = [record.get('price_per_hour') for record in records]
+    capacity = [record.get('capacity') for record in records]
+    price = [np.nan if value is None else value for value in price]
+    capacity = [np.nan if value is None else value for value in capacity]
+    numeric, numeric_names = numeric_block(price, capacity)
+
+    category_names, category_codes = [], {}
+    codes = []
+    for record in records:
+        category = record.get('category')
+        if category in MISSING_TEXT:
+            codes.append(-1)
+            continue
+        if category not in category_codes:
+            category_codes[category] = len(category_names)
+            category_names.append(category)
+        codes.append(category_codes[category])
+    categories = one_hot(codes, len(category_names))
+
+    amenity_names, amenity_codes = [], {}
+    rows, cols = [], []
+    for r, record in enumerate(records):
+        for amenity in set(record.get('amenities') or []):
+            if amenity not in amenity_codes:
+                amenity_codes[amenity] = len(amenity_names)
+                amenity_names.append(amenity)
+            rows.append(r)
+            cols.append(amenity_codes[amenity])
+    amenities = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(records), len(amenity_names))
+    )
+
+    return FeatureMatrix(ids, numeric, numeric_names, categories, category_names, amenities, amenity_names)
+
+
+def feature_matrix_from_snapshots(table, latest_only=True):
+    """FeatureMatrix from a snapshot_columns table, optionally just each listing's latest row"""
+    if latest_only:
+        listing = np.asarray(table['listing'])
+        crawled_at = np.asarray(table['crawled_at'])
+        order = np.lexsort((crawled_at, listing))
+        last = np.r_[listing[order][1:] != listing[order][:-1], True]
+        rows = order[last]
+    else:
+        rows = np.arange(len(table))
+
+    numeric, numeric_names = numeric_block(np.asarray(table['price_per_hour'])[rows],
+                                           np.asarray(table['capacity'])[rows])
+    categories = one_hot(np.asarray(table['category'])[rows], len(table.dictionaries['categories']))
+    amenities = sparse.csr_matrix(table.amenity_matrix()[rows].astype(np.float32))
+    ids = list(np.asarray(table.dictionaries['listings'], dtype=object)[np.asarray(table['listing'])[rows]])
+
+    return FeatureMatrix(ids, numeric, numeric_names, categories, table.dictionaries['categories'],
+                         amenities, table.dictionaries['amenities'])
+
+
+def feature_price_correlations(X, price):
+    """Pearson correlation of every column of X (dense or sparse) with price
+
+    Rows with a missing price are dropped. Works on sparse X without densifying.
+    """
+    price = np.asarray(price, dtype=np.float64)
+    keep = ~np.isnan(price)
+    X, y = X[keep], price[keep]
+    n = len(y)
+    if n < 2:
+        return np.full(X.shape[1], np.nan)
+
+    if sparse.issparse(X):
+        y = y - y.mean()
+        X = X.tocsc().astype(np.float64)
+        mean = np.asarray(X.mean(axis=0)).ravel()
+        sq_mean = np.asarray(X.multiply(X).mean(axis=0)).ravel()
+        cov = np.asarray(X.T @ y).ravel() / n  # y is centered, so the mean term drops out
+        std_x = np.sqrt(np.maximum(sq_mean - mean ** 2, 0))
+        std_y = y.std()
+    else:
+        # Each column only counts the rows where it has a value, for x and y alike
+        X = np.asarray(X, dtype=np.float64)
+        mask = ~np.isnan(X)
+        counts = mask.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_mean = np.where(mask, X, 0.0).sum(axis=0) / counts
+            y_mean = (mask * y[:, None]).sum(axis=0) / counts
+            Xc = np.where(mask, X - x_mean, 0.0)
+            Yc = np.where(mask, y[:, None] - y_mean, 0.0)
+            cov = (Xc * Yc).sum(axis=0) / counts
+            std_x = np.sqrt((Xc ** 2).sum(axis=0) / counts)
+            std_y = np.sqrt((Yc ** 2).sum(axis=0) / counts)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return cov / (std_x * std_y)
+
+
+def price_panel(table, day_seconds=SECONDS_PER_DAY):
+    """(listing codes, day numbers, listings x days price matrix), NaN where not observed
+
+    Columns are every calendar day from the first crawl to the last, so windows count days, not crawls.
+    """
+    listing = np.asarray(table['listing'])
+    day = np.floor(np.asarray(table['crawled_at']) / day_seconds).astype(np.int64)
+    price = np.asarray(table['price_per_hour'], dtype=np.float64)
+
+    listings, li = np.unique(listing, return_inverse=True)
+    days = np.arange(day.min(), day.max() + 1) if len(day) else np.empty(0, dtype=np.int64)
+    panel = np.full((len(listings), len(days)), np.nan)
+    if len(day):
+        panel[li, day - day.min()] = price  # Later rows for the same day win
+    return listings, days, panel
+
+
+def forward_fill(panel):
+    """Carry the last observed value forward along each row"""
+    mask = ~np.isnan(panel)
+    idx = np.where(mask, np.arange(panel.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = panel[np.arange(panel.shape[0])[:, None], idx]
+    filled[~np.maximum.accumulate(mask, axis=1)] = np.nan
+    return filled
+
+
+def rolling_price_changes(panel, window=7):
+    """Absolute and percent price change over `window` days for every listing/day"""
+    filled = forward_fill(panel)
+    change = np.full_like(filled, np.nan)
+    pct = np.full_like(filled, np.nan)
+    if window < filled.shape[1]:
+        change[:, window:] = filled[:, window:] - filled[:, :-window]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pct[:, window:] = change[:, window:] / filled[:, :-window]
+    return change, pct
+
+
+def pairwise_correlations(series):
+    """NaN-aware Pearson correlation between rows of a (listings, days) matrix
+
+    Each pair uses only the days both listings were observed; everything is
+    done with a handful of matrix products instead of a Python pair loop.
+    """
+    Y = np.asarray(series, dtype=np.float64).T  # (days, listings)
+    M = (~np.isnan(Y)).astype(np.float64)
+    Y0 = np.where(M > 0, Y, 0.0)
+
+    n = M.T @ M
+    sum_i = Y0.T @ M             # sum of i over days shared with j
+    sum_sq_i = (Y0 ** 2).T @ M
+    sum_ij = Y0.T @ Y0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sum_ij - sum_i * sum_i.T / n
+        var_i = sum_sq_i - sum_i ** 2 / n
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr[n < 3] = np.nan
+    return corr
+
+
+if __name__ == "__main__":
+    from snapshot_columns import load_snapshots
+
+    parser = argparse.ArgumentParser(description="Price trend and correlation summary over crawled snapshots")
+    parser.add_argument('--snapshots', default='snapshots')
+    parser.add_argument('--window', type=int, default=7, help="rolling window in days")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--dedupe', default=None, metavar='DUPLICATES_JSON',
+                        help="near_duplicates.py output; count each duplicate cluster once")
+    args = parser.parse_args()
+
+    table = load_snapshots(args.snapshots)
+    print(f"📊 {len(table)} snapshot rows, {len(table.dictionaries['listings'])} listings")
+
+    features = feature_matrix_from_snapshots(table)
+    if args.dedupe:
+        with open(args.dedupe) as f:
+            before = len(features.ids)
+            features = drop_duplicates(features, json.load(f)['clusters'])
+        print(f"👯 Dropped {before - len(features.ids)} duplicate listings")
+    price = features.price()
+
+    print("\n💰 Amenity correlation with hourly price:")
+    corr = feature_price_correlations(features.amenities, price)
+    for i in np.argsort(-np.nan_to_num(np.abs(corr)))[:args.top]:
+        print(f"   {features.amenity_names[i]:<30} {corr[i]:+.3f}")
+
+    print("\n🏷️ Category correlation with hourly price:")
+    corr = feature_price_correlations(features.categories, price)
+    for i in np.argsort(-np.nan_to_num(np.abs(corr)))[:args.top]:
+        print(f"   {features.category_names[i]:<30} {corr[i]:+.3f}")
+
+    listings, days, panel = price_panel(table)
+    change, pct = rolling_price_changes(panel, args.window)
+    observed = ~np.isnan(pct)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        volatility = np.where(observed, np.abs(pct), 0.0).sum(axis=1) / observed.sum(axis=1)
+    print(f"\n📈 Most volatile listings ({args.window}-day price changes):")
+    ranked = [i for i in np.argsort(-np.nan_to_num(volatility)) if not np.isnan(volatility[i])]
+    if not ranked:
+        print(f"   Not enough history yet: no listing has prices {args.window} days apart")
+    for i in ranked[:args.top]:
+        print(f"   {table.dictionaries['listings'][listings[i]]:<30} {volatility[i]:.2%}")
@@ -0,0 +1,326 @@
+import argparse
+import json
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+from scipy import sparse
+from scipy.fft import dctn
+from scipy.sparse.csgraph import connected_components
+
+from photo_downloader import high_res_url
+
+PHASH_SIZE = 32          # Thumbnail edge the DCT runs on
+PHASH_LOW = 8            # Keep the 8x8 lowest frequencies -> 64-bit hash
+EMPTY_MINHASH = (1 << 32) - 1  # Signature value of texts without shingles
+EMPTY_PHASH = (1 << 64) - 1
+MAX_BUCKET = 200         # LSH buckets bigger than this are stock photos/boilerplate, not duplicates
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+MISSING_TEXT = ('Not found', 'No description found')
+
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def perceptual_hash(path):
+    """64-bit pHash: low DCT frequencies of a grayscale thumbnail compared to their median"""
+    with Image.open(path) as img:
+        img.draft('L', (PHASH_SIZE * 4, PHASH_SIZE * 4))  # Let JPEG decode at reduced size
+        pixels = np.asarray(img.convert('L').resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS), dtype=np.float64)
+    low = dctn(pixels, norm='ortho')[:PHASH_LOW, :PHASH_LOW].ravel()
+    bits = low > np.median(low[1:])  # DC term would dominate the median
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def perceptual_hash_or_none(path):
+    try:
+        return perceptual_hash(path)
+    except Exception:
+        return None
+
+
+def hash_photos(paths, workers=None, chunksize=64):
+    """Perceptual hash per path (None if unreadable), decoded in a process pool"""
+    if len(paths) < chunksize:
+        return [perceptual_hash_or_none(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(perceptual_hash_or_none, paths, chunksize=chunksize))
+
+
+def hamming(a, b):
+    """Bit distance between two arrays of uint64 hashes"""
+    x = np.bitwise_xor(np.asarray(a, dtype=np.uint64), np.asarray(b, dtype=np.uint64))
+    return POPCOUNT[x.view(np.uint8).reshape(len(x), 8)].sum(axis=1)
+
+
+def shingles(text, k=3):
+    """Word k-grams of normalised text"""
+    tokens = TOKEN_PATTERN.findall((text or '').lower())
+    if len(tokens) < k:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+
+
+class MinHasher:
+    """MinHash signatures from multiply-shift hashes ((a*x + b) mod 2^64) >> 32 over crc32 shingle hashes"""
+
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)  # Odd
+        self.b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+
+    def signatures(self, texts, chunk_shingles=2048):
+        """(len(texts), num_perm) signatures; empty texts get an all-EMPTY_MINHASH row that matches nothing"""
+        shingle_hashes = [[zlib.crc32(s.encode('utf-8')) for s in shingles(text)] for text in texts]
+        counts = np.array([len(hashes) for hashes in shingle_hashes], dtype=np.int64)
+        result = np.full((len(texts), self.num_perm), EMPTY_MINHASH, dtype=np.uint32)
+
+        # Batches of whole texts, one (shingles, num_perm) product and a segmented min per batch
+        start = 0
+        while start < len(texts):
+            end = start + 1
+            total = counts[start]
+            while end < len(texts) and total + counts[end] <= chunk_shingles:
+                total += counts[end]
+                end += 1
+            nonempty = np.flatnonzero(counts[start:end]) + start
+            if len(nonempty):
+                hashes = np.fromiter((h for i in nonempty for h in shingle_hashes[i]), dtype=np.uint64)
+                # uint64 arithmetic wraps, which is exactly the mod 2^64 the hash needs
+                permuted = (hashes[:, None] * self.a + self.b) >> np.uint64(32)
+                offsets = np.r_[0, np.cumsum(counts[nonempty])[:-1]]
+                result[nonempty] = np.minimum.reduceat(permuted, offsets, axis=0)
+            start = end
+        return result
+
+
+def bucket_pairs(keys, max_bucket=MAX_BUCKET):
+    """(i, j) pairs with i < j of items sharing a key; negative keys and oversized buckets are skipped"""
+    keys = np.asarray(keys)
+    if not len(keys):
+        return np.empty((0, 2), dtype=np.int64)
+    order = np.argsort(keys, kind='stable')
+    ordered = keys[order]
+    starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+    sizes = np.diff(np.r_[starts, len(keys)])
+    keep = (sizes >= 2) & (sizes <= max_bucket) & (ordered[starts] >= 0)
+
+    pairs = [np.empty((0, 2), dtype=np.int64)]
+    for size in np.unique(sizes[keep]):
+        group_starts = starts[keep & (sizes == size)]
+        members = order[group_starts[:, None] + np.arange(size)]  # (groups, size)
+        i, j = np.triu_indices(size, 1)
+        pairs.append(np.stack([members[:, i].ravel(), members[:, j].ravel()], axis=1))
+    return np.sort(np.concatenate(pairs), axis=1)
+
+
+def unique_pairs(pairs):
+    """Sorted distinct rows of an (n, 2) pair array (packed into one int64 key per pair)"""
+    if not len(pairs):
+        return pairs
+    width = np.int64(pairs.max()) + 1
+    keys = np.unique(pairs[:, 0].astype(np.int64) * width + pairs[:, 1])
+    return np.stack([keys // width, keys % width], axis=1)
+
+
+def band_keys(signatures, bands):
+    """One integer key per row per band: rows with identical band slices share a key"""
+    rows = signatures.shape[1] // bands
+    keys = []
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        _, inverse = np.unique(block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel(),
+                               return_inverse=True)
+        keys.append(inverse.ravel())
+    return keys
+
+
+def text_candidate_pairs(signatures, bands=32, max_bucket=MAX_BUCKET):
+    """MinHash LSH: listings whose signatures agree on every row of at least one band"""
+    empty = (signatures == EMPTY_MINHASH).all(axis=1)
+    candidates = []
+    for keys in band_keys(signatures, bands):
+        keys = np.where(empty, -1, keys)
+        candidates.append(bucket_pairs(keys, max_bucket))
+    return unique_pairs(np.concatenate(candidates))
+
+
+def photo_candidate_pairs(phashes, tables=24, bits_per_table=20, seed=0, max_bucket=MAX_BUCKET):
+    """Bit-sampling LSH over 64-bit hashes: photos sharing all sampled bits in any table"""
+    phashes = np.asarray(phashes, dtype=np.uint64)
+    bits = np.unpackbits(phashes.astype('>u8').view(np.uint8).reshape(len(phashes), 8), axis=1)
+    weights = (1 << np.arange(bits_per_table)).astype(np.int64)
+    rng = np.random.default_rng(seed)
+    candidates = []
+    for _ in range(tables):
+        positions = rng.choice(64, bits_per_table, replace=False)
+        candidates.append(bucket_pairs(bits[:, positions].astype(np.int64) @ weights, max_bucket))
+    return unique_pairs(np.concatenate(candidates))
+
+
+class DuplicateFinder:
+    """Candidate duplicate listings from shared near-identical photos and similar text
+
+    Listings are added with their text and the perceptual hashes of their
+    photos; find() runs both LSH indexes and verifies only the candidates.
+    """
+
+    def __init__(self, num_perm=128, bands=32, text_threshold=0.7, max_photo_distance=6, min_shared_photos=2):
+        self.minhasher = MinHasher(num_perm)
+        self.bands = bands
+        self.text_threshold = text_threshold
+        self.max_photo_distance = max_photo_distance
+        self.min_shared_photos = min_shared_photos
+        self.ids = []
+        self.texts = []
+        self.photo_sets = []
+
+    def add(self, listing_id, text, phashes):
+        self.ids.append(listing_id)
+        self.texts.append(text)
+        self.photo_sets.append([phash for phash in phashes if phash is not None])
+
+    def shared_photos(self):
+        """Sparse listings x listings count of matched photo pairs"""
+        phashes, inverse = np.unique(
+            np.array([phash for photos in self.photo_sets for phash in photos], dtype=np.uint64),
+            return_inverse=True
+        )
+        owners = np.repeat(np.arange(len(self.ids)), [len(photos) for photos in self.photo_sets])
+        incidence = sparse.csr_matrix(
+            (np.ones(len(owners)), (inverse.ravel(), owners)), shape=(len(phashes), len(self.ids))
+        )
+        incidence.data[:] = 1  # A listing repeating a photo still shares it once
+        # Flat images hash to all zeros/ones and stock photos appear everywhere; neither says "same venue"
+        owner_counts = np.diff(incidence.indptr)
+        uninformative = (phashes == 0) | (phashes == np.uint64(EMPTY_PHASH)) | (owner_counts > MAX_BUCKET)
+        incidence = sparse.diags((~uninformative).astype(np.float64)) @ incidence
+
+        pairs = photo_candidate_pairs(phashes)
+        if len(pairs):
+            pairs = pairs[hamming(phashes[pairs[:, 0]], phashes[pairs[:, 1]]) <= self.max_photo_distance]
+        matches = sparse.coo_matrix(
+            (np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(len(phashes), len(phashes))
+        )
+        # Identical hashes collapse to one row, so the identity covers exact duplicates
+        matches = (matches + matches.T + sparse.identity(len(phashes))).tocsr()
+        shared = (incidence.T @ matches @ incidence).tocoo()
+        keep = shared.row < shared.col
+        return sparse.coo_matrix((shared.data[keep], (shared.row[keep], shared.col[keep])), shape=shared.shape)
+
+    def find(self):
+        """Duplicate pairs as dicts with both scores, most similar first"""
+        signatures = self.minhasher.signatures(self.texts)
+        empty_text = (signatures == EMPTY_MINHASH).all(axis=1)
+
+        def text_similarity(pairs):
+            score = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+            return np.where(empty_text[pairs[:, 0]] | empty_text[pairs[:, 1]], 0.0, score)
+
+        text_pairs = text_candidate_pairs(signatures, self.bands)
+        text_pairs = text_pairs[text_similarity(text_pairs) >= self.text_threshold] if len(text_pairs) else text_pairs
+
+        shared = self.shared_photos()
+        photo_pairs = np.stack([shared.row, shared.col], axis=1)[shared.data >= self.min_shared_photos]
+
+        pairs = unique_pairs(np.concatenate([text_pairs, photo_pairs]).astype(np.int64))
+        if not len(pairs):
+            return []
+        text_scores = text_similarity(pairs)
+        counts = np.asarray(shared.tocsr()[pairs[:, 0], pairs[:, 1]]).ravel().astype(int)
+        photo_counts = np.array([len(set(photos)) for photos in self.photo_sets])
+        fewest = np.minimum(photo_counts[pairs[:, 0]], photo_counts[pairs[:, 1]])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            overlap = np.where(fewest > 0, np.minimum(counts / fewest, 1.0), 0.0)
+
+        order = np.lexsort((-text_scores, -overlap))
+        return [
+            {
+                'a': self.ids[i], 'b': self.ids[j],
+                'text_similarity': round(float(text_scores[k]), 3),
+                'shared_photos': int(counts[k]),
+                'photo_overlap': round(float(overlap[k]), 3),
+            }
+            for k, (i, j) in ((k, pairs[k]) for k in order)
+        ]
+
+
+def duplicate_clusters(ids, pairs):
+    """Groups of listing ids joined by duplicate pairs (singletons left out)"""
+    index = {listing_id: i for i, listing_id in enumerate(ids)}
+    rows = [index[pair['a']] for pair in pairs]
+    cols = [index[pair['b']] for pair in pairs]
+    graph = sparse.coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(ids), len(ids)))
+    _, labels = connected_components(graph, directed=False)
+    clusters = {}
+    for listing_id, label in zip(ids, labels):
+        clusters.setdefault(label, []).append(listing_id)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def listing_text(record):
+    parts = [record.get('name'), record.get('description')]
+    return ' '.join(part for part in parts if isinstance(part, str) and part not in MISSING_TEXT)
+
+
+def finder_from_stores(listing_store, photo_store, workers=None, **kwargs):
+    """DuplicateFinder over every stored listing, hashing photos missing from the photo store"""
+    records = list(listing_store.records())
+    photo_hashes = []  # Content hashes per listing
+    paths = {}
+    for _, record in records:
+        hashes = []
+        for url in record.get('photos') or []:
+            entry = photo_store.lookup(high_res_url(url))  # Same key download_venue_photos stored it under
+            if entry:
+                hashes.append(entry['content_hash'])
+                paths[entry['content_hash']] = entry['path']
+        photo_hashes.append(hashes)
+
+    known = photo_store.perceptual_hashes(paths)
+    missing = [content_hash for content_hash in paths if content_hash not in known]
+    if missing:
+        print(f"🖼️ Hashing {len(missing)} photos ({len(known)} cached)")
+        computed = dict(zip(missing, hash_photos([paths[content_hash] for content_hash in missing], workers)))
+        computed = {content_hash: phash for content_hash, phash in computed.items() if phash is not None}
+        photo_store.put_perceptual_hashes(computed)
+        known.update(computed)
+
+    finder = DuplicateFinder(**kwargs)
+    for (listing_id, record), hashes in zip(records, photo_hashes):
+        finder.add(listing_id, listing_text(record), [known.get(content_hash) for content_hash in hashes])
+    return finder
+
+
+if __name__ == "__main__":
+    from listing_store import ListingStore
+    from photo_store import PhotoStore
+
+    parser = argparse.ArgumentParser(description="Find listings that are the same venue (shared photos or text)")
+    parser.add_argument('--store', default='listings.sqlite')
+    parser.add_argument('--photos', default='photo_store', help="photo store filled by download_venue_photos")
+    parser.add_argument('--workers', type=int, default=None, help="processes for photo hashing")
+    parser.add_argument('--text-threshold', type=float, default=0.7)
+    parser.add_argument('--min-shared-photos', type=int, default=2)
+    parser.add_argument('--out', default='duplicates.json')
+    args = parser.parse_args()
+
+    listing_store = ListingStore(args.store)
+    photo_store = PhotoStore(args.photos)
+    finder = finder_from_stores(listing_store, photo_store, args.workers, text_threshold=args.text_threshold,
+                                min_shared_photos=args.min_shared_photos)
+    listing_store.close()
+    photo_store.close()
+
+    pairs = finder.find()
+    clusters = duplicate_clusters(finder.ids, pairs)
+    with open(args.out, 'w') as f:
+        json.dump({'pairs': pairs, 'clusters': clusters}, f, indent=2)
+
+    print(f"👯 {len(pairs)} duplicate pairs in {len(clusters)} clusters across {len(finder.ids)} listings")
+    for members in sorted(clusters, key=len, reverse=True)[:10]:
+        print(f"   {len(members)}: {', '.join(members[:5])}{' ...' if len(members) > 5 else ''}")
+    print(f"💾 Saved to {args.out}")
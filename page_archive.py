@@ -0,0 +1,274 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing as mp
+import os
+import sqlite3
+import time
+import zlib
+from datetime import datetime
+
+from listing_parser import ListingPageParser
+
+ZDICT_BYTES = 32 * 1024  # zlib's window, a larger preset dictionary is not used
+SEGMENT_BYTES = 256 * 1024 * 1024
+
+# What one fetch can leave behind
+KINDS = ('html', 'text', 'gallery')
+
+_segment_numbers = itertools.count()  # Unique per process even across archive instances
+
+
+class PageArchive:
+    """Append-only compressed archive of fetched listing pages, indexed by listing id and fetch time
+
+    Pages are zlib-compressed one by one into segment files, with a preset
+    dictionary taken from the segment's first page, so the shared boilerplate
+    of listing pages costs almost nothing while any page stays readable on its
+    own. Each writer process appends to its own segments; the SQLite index is
+    shared (WAL). A page identical to the listing's previous one only adds an
+    index row.
+    """
+
+    def __init__(self, root='page_archive', segment_bytes=SEGMENT_BYTES, compress_level=6):
+        self.root = root
+        self.segments_dir = os.path.join(root, 'segments')
+        os.makedirs(self.segments_dir, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.compress_level = compress_level
+        self.segment = None      # Name of the segment this process appends to
+        self.segment_file = None
+        self.zdicts = {}
+        self.readers = {}
+
+        self.db = sqlite3.connect(os.path.join(root, 'index.sqlite'), timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")  # Crawl workers in other processes write too
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY,
+                listing_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                content_hash TEXT NOT NULL,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                raw_length INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_listing ON pages (listing_id, fetched_at);
+            CREATE INDEX IF NOT EXISTS pages_fetched ON pages (fetched_at);
+        """)
+        self.db.commit()
+
+    def segment_path(self, segment, suffix='.zz'):
+        return os.path.join(self.segments_dir, segment + suffix)
+
+    def zdict(self, segment):
+        if segment not in self.zdicts:
+            with open(self.segment_path(segment, '.zdict'), 'rb') as f:
+                self.zdicts[segment] = f.read()
+        return self.zdicts[segment]
+
+    def open_segment(self, sample):
+        """Start a new segment for this process, its dictionary is the tail of `sample`"""
+        if self.segment_file:
+            self.segment_file.close()
+        self.segment = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_segment_numbers)}"
+        zdict = sample[-ZDICT_BYTES:]
+        with open(self.segment_path(self.segment, '.zdict'), 'wb') as f:
+            f.write(zdict)
+        self.zdicts[self.segment] = zdict
+        self.segment_file = open(self.segment_path(self.segment), 'ab')
+
+    def add(self, listing_id, url, kind, content, fetched_at=None):
+        """Archive one page (or captured JSON/text) and return its index row id"""
+        if not isinstance(content, (bytes, str)):
+            content = json.dumps(content)
+        raw = content.encode('utf-8') if isinstance(content, str) else content
+        content_hash = hashlib.sha256(raw).hexdigest()
+        fetched_at = fetched_at or time.time()
+
+        previous = self.db.execute(
+            "SELECT segment, offset, length FROM pages WHERE listing_id = ? AND kind = ? AND content_hash = ? "
+            "ORDER BY fetched_at DESC LIMIT 1",
+            (listing_id, kind, content_hash)
+        ).fetchone()
+        if previous:
+            segment, offset, length = previous  # Unchanged page, point at the bytes already stored
+        else:
+            if self.segment_file is None or self.segment_file.tell() >= self.segment_bytes:
+                self.open_segment(raw)
+            compressor = zlib.compressobj(self.compress_level, zdict=self.zdicts[self.segment])
+            data = compressor.compress(raw) + compressor.flush()
+            segment, offset, length = self.segment, self.segment_file.tell(), len(data)
+            self.segment_file.write(data)
+            self.segment_file.flush()  # Bytes land before the index row that points at them
+
+        cursor = self.db.execute(
+            "INSERT INTO pages (listing_id, url, kind, fetched_at, content_hash, segment, offset, length, raw_length) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (listing_id, url, kind, fetched_at, content_hash, segment, offset, length, len(raw))
+        )
+        self.db.commit()
+        return cursor.lastrowid
+
+    def read(self, segment, offset, length):
+        """Decompressed bytes of one archived record"""
+        if segment not in self.readers:
+            self.readers[segment] = open(self.segment_path(segment), 'rb')
+        reader = self.readers[segment]
+        reader.seek(offset)
+        return zlib.decompressobj(zdict=self.zdict(segment)).decompress(reader.read(length))
+
+    def rows(self, since=None, until=None, listing_ids=None, kinds=KINDS):
+        """Index rows as dicts, grouped by segment and offset so reads stay sequential"""
+        query = "SELECT id, listing_id, url, kind, fetched_at, segment, offset, length FROM pages WHERE 1 = 1"
+        params = []
+        if since is not None:
+            query += " AND fetched_at >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND fetched_at < ?"
+            params.append(until)
+        if listing_ids is not None:
+            listing_ids = list(listing_ids)
+            query += f" AND listing_id IN ({','.join('?' * len(listing_ids))})"
+            params += listing_ids
+        query += f" AND kind IN ({','.join('?' * len(kinds))}) ORDER BY segment, offset"
+        params += list(kinds)
+        names = ('id', 'listing_id', 'url', 'kind', 'fetched_at', 'segment', 'offset', 'length')
+        return [dict(zip(names, row)) for row in self.db.execute(query, params)]
+
+    def fetches(self, **filters):
+        """Rows bundled per fetch: {(listing_id, fetched_at): {'url': ..., kind: row}}"""
+        bundles = {}
+        for row in self.rows(**filters):
+            bundle = bundles.setdefault((row['listing_id'], row['fetched_at']), {'url': row['url']})
+            bundle[row['kind']] = row
+        return bundles
+
+    def history(self, listing_id, kind='html'):
+        """[(fetched_at, page text)] for one listing, oldest first"""
+        rows = self.db.execute(
+            "SELECT fetched_at, segment, offset, length FROM pages WHERE listing_id = ? AND kind = ? ORDER BY fetched_at",
+            (listing_id, kind)
+        ).fetchall()
+        return [(fetched_at, self.read(segment, offset, length).decode('utf-8'))
+                for fetched_at, segment, offset, length in rows]
+
+    def stats(self):
+        pages, raw_bytes = self.db.execute("SELECT COUNT(*), COALESCE(SUM(raw_length), 0) FROM pages").fetchone()
+        stored = sum(os.path.getsize(os.path.join(self.segments_dir, name))
+                     for name in os.listdir(self.segments_dir))
+        return {'pages': pages, 'raw_bytes': raw_bytes, 'stored_bytes': stored}
+
+    def close(self):
+        if self.segment_file:
+            self.segment_file.close()
+            self.segment_file = None
+        for reader in self.readers.values():
+            reader.close()
+        self.readers = {}
+        self.db.close()
+
+
+def extract_fetch(archive, key, bundle):
+    """Re-run the field extractors over one archived fetch, as scrape_single_listing would"""
+    listing_id, fetched_at = key
+    html = archive.read(bundle['html']['segment'], bundle['html']['offset'], bundle['html']['length'])
+    body_text = None
+    if 'text' in bundle:  # Browser fetches also archived the rendered innerText
+        body_text = archive.read(bundle['text']['segment'], bundle['text']['offset'],
+                                 bundle['text']['length']).decode('utf-8')
+    venue_data = ListingPageParser(html.decode('utf-8'), body_text=body_text).parse(bundle['url'])
+    if 'gallery' in bundle:
+        # Photos found by clicking through the gallery can't be recovered from markup alone
+        gallery = json.loads(archive.read(bundle['gallery']['segment'], bundle['gallery']['offset'],
+                                          bundle['gallery']['length']))
+        venue_data['photos'] = list(dict.fromkeys(venue_data['photos'] + gallery))
+        venue_data['photo_count'] = len(venue_data['photos'])
+    venue_data['listing_id'] = listing_id
+    venue_data['fetched_at'] = fetched_at
+    return venue_data
+
+
+_worker_archive = None
+
+
+def init_worker(root):
+    global _worker_archive
+    _worker_archive = PageArchive(root)
+
+
+def extract_batch(batch):
+    """Worker: extract a batch of (key, bundle) fetches with this process's archive handle"""
+    results = []
+    for key, bundle in batch:
+        try:
+            results.append(extract_fetch(_worker_archive, key, bundle))
+        except Exception as e:
+            results.append({'listing_id': key[0], 'fetched_at': key[1], 'url': bundle['url'], 'error': str(e)})
+    return results
+
+
+def reextract(root, workers=None, batch_size=64, **filters):
+    """Yield re-extracted venue dicts for archived fetches, parsed in parallel with no network"""
+    archive = PageArchive(root)
+    bundles = [(key, bundle) for key, bundle in archive.fetches(**filters).items() if 'html' in bundle]
+    archive.close()
+    batches = [bundles[i:i + batch_size] for i in range(0, len(bundles), batch_size)]
+
+    with mp.get_context().Pool(workers, initializer=init_worker, initargs=(root,)) as pool:
+        for results in pool.imap(extract_batch, batches):
+            yield from results
+
+
+def parse_time(value):
+    """Unix time from a timestamp or an ISO date like 2024-05-01"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Listing page archive: stats, or re-run extraction offline")
+    parser.add_argument('command', choices=['stats', 'reextract'])
+    parser.add_argument('--archive', default='page_archive')
+    parser.add_argument('--since', default=None, help="ISO date or unix time")
+    parser.add_argument('--until', default=None, help="ISO date or unix time")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='reextracted.jsonl')
+    parser.add_argument('--snapshots', default=None, help="also write the results as a fresh snapshot history here")
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        archive = PageArchive(args.archive)
+        stats = archive.stats()
+        archive.close()
+        ratio = stats['raw_bytes'] / stats['stored_bytes'] if stats['stored_bytes'] else 0
+        print(f"📦 {stats['pages']} archived records, {stats['raw_bytes'] / 1e6:.1f} MB raw, "
+              f"{stats['stored_bytes'] / 1e6:.1f} MB stored ({ratio:.1f}x)")
+    else:
+        from snapshot_columns import SnapshotWriter
+
+        snapshots = SnapshotWriter(args.snapshots) if args.snapshots else None
+        started = time.perf_counter()
+        count = errors = 0
+        with open(args.out, 'w') as out:
+            for venue_data in reextract(args.archive, args.workers,
+                                        since=parse_time(args.since), until=parse_time(args.until)):
+                out.write(json.dumps(venue_data) + '\n')
+                count += 1
+                if 'error' in venue_data:
+                    errors += 1
+                elif snapshots:
+                    snapshots.append(venue_data['listing_id'], venue_data, crawled_at=venue_data['fetched_at'])
+        if snapshots:
+            snapshots.close()
+        elapsed = time.perf_counter() - started
+        print(f"🔁 Re-extracted {count} fetches ({errors} errors) in {elapsed:.1f}s → {args.out}")
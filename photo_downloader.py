@@ -0,0 +1,214 @@
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import DISABLED
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Request errors that won't go away by trying again
+PERMANENT_ERRORS = (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema,
+                    requests.exceptions.InvalidSchema)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available right now, never blocks"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available"""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """One token bucket per host so a slow CDN doesn't throttle the others"""
+
+    def __init__(self, rate=4.0, burst=4):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def acquire(self, url):
+        self.bucket(url).acquire()
+
+
+def high_res_url(url):
+    """Thumbnail URL without its size parameters; the photo store is keyed by these"""
+    if not url:
+        return url
+    clean_url = re.sub(r'[?&]w=\d+', '', url)
+    clean_url = re.sub(r'[?&]h=\d+', '', clean_url)
+    clean_url = re.sub(r'/w_\d+,h_\d+/', '/', clean_url)
+    return re.sub(r'_thumb\.', '.', clean_url)
+
+
+def photo_extension(url):
+    """File extension from the URL path, .jpg when there isn't a sensible one"""
+    ext = os.path.splitext(urlparse(url).path)[1].lower()
+    return ext if ext in ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif') else '.jpg'
+
+
+class PhotoDownloader:
+    """Concurrent photo downloads over a shared connection pool, streamed to disk
+
+    With a PhotoStore, requests are conditional and bodies go into the store;
+    each job's path then becomes a link to the stored object.
+    """
+
+    def __init__(self, max_workers=8, per_host_rate=4.0, burst=4, retries=3, backoff=0.5,
+                 timeout=15, chunk_size=64 * 1024, session=None, store=None, instrumentation=DISABLED):
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.limiter = HostRateLimiter(per_host_rate, burst)
+        self.store = store
+        self.instrumentation = instrumentation
+        self.session = instrumentation.wrap_session(session or self.make_session(max_workers))
+
+    @staticmethod
+    def make_session(pool_size):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def retry_delay(self, attempt, response=None):
+        """Exponential backoff with jitter, honouring Retry-After when given"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff * (2 ** attempt) * (0.5 + random.random())
+
+    def download(self, url, path):
+        """Download one photo to path, returns a result dict instead of raising"""
+        with self.instrumentation.span('download') as span:
+            result = self.fetch(url, path)
+            span.set(status=result['status'], bytes=result['bytes'], cached=result['cached'],
+                     attempts=result['attempts'])
+        return result
+
+    def fetch(self, url, path):
+        result = {'url': url, 'path': path, 'status': None, 'bytes': 0, 'attempts': 0,
+                  'error': None, 'cached': False, 'content_hash': None}
+        headers = self.store.conditional_headers(url) if self.store else {}
+
+        attempt = 0
+        while True:
+            result['attempts'] = attempt + 1
+            self.limiter.acquire(url)
+            try:
+                with self.session.get(url, stream=True, timeout=self.timeout, headers=headers) as response:
+                    result['status'] = response.status_code
+                    if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                        time.sleep(self.retry_delay(attempt, response))
+                        attempt += 1
+                        continue
+                    if response.status_code == 304 and self.store:
+                        entry = self.store.lookup(url)
+                        if entry:
+                            self.store.mark_checked(url)
+                            self.finish_from_store(result, entry, cached=True)
+                            return result
+                        if headers:
+                            # Object vanished since we asked: fetch it in full, that's not a failed attempt
+                            headers = {}
+                            continue
+                    if response.status_code != 200:
+                        result['error'] = f"Status {response.status_code}"
+                        return result
+
+                    if self.store:
+                        self.finish_from_store(result, self.store.put_stream(url, response, self.chunk_size))
+                    else:
+                        result['bytes'] = self.stream_to_file(response, path)
+                    result['error'] = None
+                    return result
+
+            except requests.RequestException as e:
+                result['error'] = str(e)
+                if isinstance(e, PERMANENT_ERRORS) or attempt >= self.retries:
+                    return result
+                time.sleep(self.retry_delay(attempt))
+                attempt += 1
+
+    def finish_from_store(self, result, entry, cached=False):
+        """Fill a result from a store entry and link it into the job's path"""
+        result['cached'] = cached
+        result['content_hash'] = entry['content_hash']
+        result['bytes'] = 0 if cached else entry['bytes']
+        result['object_path'] = entry['path']
+        if result['path']:
+            self.store.link(entry['path'], result['path'])
+
+    def stream_to_file(self, response, path):
+        """Write the body in chunks to a temp file, then move it into place"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = path + '.part'
+        written = 0
+        with open(temp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    written += len(chunk)
+        os.replace(temp_path, path)
+        return written
+
+    def iter_batch(self, jobs):
+        """Download (url, path) jobs concurrently, yielding results as they finish"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self.download, url, path) for url, path in jobs]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def download_batch(self, jobs):
+        """Download (url, path) jobs concurrently and return all results"""
+        return list(self.iter_batch(jobs))
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from photo_downloader import photo_extension
+
+
+def normalize_url(url):
+    """Canonical form of a photo URL: lowercase host, sorted query, no fragment"""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
+
+
+def url_key(url):
+    return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+
+class PhotoStore:
+    """Content-addressed photo store with an ETag/Last-Modified index per URL
+
+    Objects live under objects/<hash[:2]>/<sha256><ext>, so the same CDN image is
+    stored once no matter how many venues or runs reference it. Venue folders are
+    views made of hard links (or symlinks) plus a manifest.json, never copies.
+    """
+
+    def __init__(self, root='photo_store'):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(root, 'index.sqlite'), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                checked_at REAL NOT NULL
+            )
+        """)
+        # Perceptual hashes belong to the bytes, so they are keyed by content hash
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS perceptual_hashes (
+                content_hash TEXT PRIMARY KEY,
+                phash INTEGER NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def object_path(self, content_hash, ext):
+        return os.path.join(self.objects_dir, content_hash[:2], content_hash + ext)
+
+    def lookup(self, url):
+        """Index entry for a URL, or None if it was never stored"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT url, content_hash, ext, bytes, etag, last_modified FROM urls WHERE url_key = ?",
+                (url_key(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(('url', 'content_hash', 'ext', 'bytes', 'etag', 'last_modified'), row))
+        entry['path'] = self.object_path(entry['content_hash'], entry['ext'])
+        if not os.path.exists(entry['path']):
+            return None  # Object was pruned, treat as unknown
+        return entry
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a URL we already hold"""
+        entry = self.lookup(url)
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def mark_checked(self, url):
+        """Record a 304 so we know the cached copy was revalidated"""
+        with self.lock:
+            self.db.execute("UPDATE urls SET checked_at = ? WHERE url_key = ?", (time.time(), url_key(url)))
+            self.db.commit()
+
+    def put_stream(self, url, response, chunk_size=64 * 1024):
+        """Stream a 200 response into the store, returns the index entry"""
+        temp_path = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with open(temp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+                        written += len(chunk)
+
+            content_hash = digest.hexdigest()
+            ext = photo_extension(url)
+            path = self.object_path(content_hash, ext)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                os.remove(temp_path)  # Same bytes already stored under another URL or run
+            else:
+                os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url_key(url), normalize_url(url), content_hash, ext, written,
+                 response.headers.get('ETag'), response.headers.get('Last-Modified'), now, now)
+            )
+            self.db.commit()
+
+        return {'url': url, 'content_hash': content_hash, 'ext': ext, 'bytes': written, 'path': path}
+
+    def perceptual_hashes(self, content_hashes):
+        """{content_hash: 64-bit perceptual hash} for the objects already hashed"""
+        found = {}
+        content_hashes = list(content_hashes)
+        with self.lock:
+            for start in range(0, len(content_hashes), 500):
+                batch = content_hashes[start:start + 500]
+                rows = self.db.execute(
+                    f"SELECT content_hash, phash FROM perceptual_hashes WHERE content_hash IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                found.update((content_hash, phash & 0xFFFFFFFFFFFFFFFF) for content_hash, phash in rows)
+        return found
+
+    def put_perceptual_hashes(self, hashes):
+        """Store {content_hash: 64-bit perceptual hash} (SQLite integers are signed)"""
+        rows = [(content_hash, phash - (1 << 64) if phash >= 1 << 63 else phash)
+                for content_hash, phash in hashes.items()]
+        with self.lock:
+            self.db.executemany("INSERT OR REPLACE INTO perceptual_hashes VALUES (?, ?)", rows)
+            self.db.commit()
+
+    def link(self, object_path, view_path):
+        """Expose a stored object at view_path as a hard link, falling back to a symlink"""
+        os.makedirs(os.path.dirname(view_path) or '.', exist_ok=True)
+        if os.path.lexists(view_path):
+            if os.path.exists(view_path) and os.path.samefile(view_path, object_path):
+                return view_path
+            os.remove(view_path)
+        try:
+            os.link(object_path, view_path)
+        except OSError:
+            try:
+                os.symlink(os.path.abspath(object_path), view_path)
+            except OSError:
+                return None  # No link support, the manifest still points at the object
+        return view_path
+
+    def write_manifest(self, folder, venue, entries):
+        """manifest.json for a venue view: which file is which URL and object"""
+        os.makedirs(folder, exist_ok=True)
+        manifest = {
+            'venue': venue,
+            'updated_at': time.time(),
+            'photos': entries,
+        }
+        with open(os.path.join(folder, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
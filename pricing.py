@@ -0,0 +1,206 @@
+import argparse
+import json
+import re
+import sys
+import time
+
+NUMBER = r'\d{1,3}(?:,\d{3})+|\d+'
+PEOPLE = r'(?:people|guests?|persons|attendees|ppl)'
+
+# One alternation scanned once over the page text; m.lastgroup names the branch that matched.
+# The leading guards only try it at word starts that can begin a branch (keep in sync), ~4x faster.
+CANDIDATE_PATTERN = re.compile(rf"""
+    (?<![\w$])(?=[\d$srtbcdumoah])
+    (?:
+    (?P<tier>
+        (?P<tier_label>seated|standing|reception|theat(?:er|re)|banquet|classroom|cocktail|dining|boardroom)
+        (?:\s+(?:capacity|{PEOPLE}))?\s*:?\s*(?:up\s+to\s+)?(?P<tier_count>\d+)
+      | (?P<tier_count_b>\d+)\s*{PEOPLE}?\s*\(?(?P<tier_label_b>seated|standing)\b\)?
+    )
+  | (?P<capacity>
+        up\s+to\s+(?P<cap_a>\d+)\s*{PEOPLE}
+      | (?:max(?:imum)?\s+)?(?:capacity|occupancy|accommodates|holds)(?:\s+of)?\s*:?\s*(?P<cap_b>\d+)
+      | (?P<cap_c>\d+)\s*{PEOPLE}\b
+    )
+  | (?P<minimum>
+        min(?:imum)?\.?(?:\s+(?:booking|rental|of))*\s*:?\s*(?P<min_a>\d+)\s*-?\s*(?:hours?|hrs?|h)\b
+      | (?P<min_b>\d+)\s*-?\s*(?:hours?|hrs?|h)\.?\s+min(?:imum)?\b
+    )
+  | (?P<money>
+        (?:(?:\$|USD\s?)\s?(?P<amount>{NUMBER})|(?P<amount_b>{NUMBER})\s?(?:USD|dollars?)\b)(?:\.\d{{1,2}})?
+        (?:\s*(?:/|per\s|an?\s)\s*(?P<unit>hours?|hrs?|h|days?|nights?|person|people|guests?|head|event|booking)\b
+          | \s*(?P<unit_adverb>hourly|daily|nightly)\b)?
+    )
+    )
+""", re.IGNORECASE | re.VERBOSE)
+
+UNITS = {
+    'hour': 'hour', 'hours': 'hour', 'hr': 'hour', 'hrs': 'hour', 'h': 'hour', 'hourly': 'hour',
+    'day': 'day', 'days': 'day', 'night': 'day', 'nights': 'day', 'daily': 'day', 'nightly': 'day',
+    'person': 'person', 'people': 'person', 'guest': 'person', 'guests': 'person', 'head': 'person',
+    'event': 'event', 'booking': 'event',
+}
+
+FEE_PATTERN = re.compile(
+    r'cleaning|service|security|deposit|overtime|damage|processing|\bfees?\b|\btax|insurance|'
+    r'parking|staff|attendant|additional|extra|each add', re.IGNORECASE
+)
+FEE_SUFFIX_PATTERN = re.compile(
+    r'[ \t]*(?:one[- ]time[ \t]+)?(?:(?:cleaning|service|security|booking|processing|overtime|damage)[ \t]+)?'
+    r'(?:fee|deposit)s?\b', re.IGNORECASE
+)
+DISCOUNT_PATTERN = re.compile(r'[ \t]*(?:off\b|discount)', re.IGNORECASE)
+# A line with an amount on it labels that amount, not the next line's
+AMOUNT_PATTERN = re.compile(r'\$\s?\d|USD\s?\d|\d\s?(?:USD|dollars?)\b', re.IGNORECASE)
+DISCOUNT_LABEL_PATTERN = re.compile(r'\bsave\b|discount|was\b|originally', re.IGNORECASE)
+RATE_LABEL_PATTERN = re.compile(r'\bfrom\b|starting|\brate\b|\bprice\b|\bhourly\b', re.IGNORECASE)
+
+LABEL_CHARS = 40
+LABEL_STRIP = ' \t:-–—|•·,'
+
+# Hourly rates outside this range are prices of something else
+HOURLY_RANGE = (10, 2000)
+CAPACITY_RANGE = (1, 5000)
+
+
+def context_label(text, start):
+    """Text leading up to a match on its own line, or the previous line when it starts one
+
+    A previous line with an amount of its own ("Cleaning fee: $150") labels
+    that amount, so it is not borrowed.
+    """
+    line_start = text.rfind('\n', 0, start) + 1
+    label = text[max(line_start, start - LABEL_CHARS):start].strip(LABEL_STRIP)
+    if not label and line_start > 1:
+        previous_start = text.rfind('\n', 0, line_start - 1) + 1
+        previous = text[previous_start:line_start - 1]
+        if not AMOUNT_PATTERN.search(previous):
+            label = previous.strip(LABEL_STRIP)[-LABEL_CHARS:]
+    return label
+
+
+def to_number(value):
+    return int(value.replace(',', ''))
+
+
+def price_candidates(text):
+    """Every price, minimum-hours and capacity mention with its unit, label and position, in page order"""
+    candidates = []
+    for match in CANDIDATE_PATTERN.finditer(text):
+        kind = match.lastgroup
+        start, end = match.span()
+        if kind == 'money':
+            suffix = FEE_SUFFIX_PATTERN.match(text, end)
+            if DISCOUNT_PATTERN.match(text, end):
+                continue
+            label = context_label(text, start)
+            if DISCOUNT_LABEL_PATTERN.search(label):
+                continue
+            unit = match.group('unit') or match.group('unit_adverb')
+            candidates.append({
+                'kind': 'fee' if suffix or FEE_PATTERN.search(label) else 'price',
+                'amount': to_number(match.group('amount') or match.group('amount_b')),
+                'unit': UNITS[unit.lower()] if unit else None,
+                'label': suffix.group(0).strip() if suffix else label,
+                'position': start,
+            })
+        elif kind == 'minimum':
+            candidates.append({'kind': 'min_hours', 'amount': int(match.group('min_a') or match.group('min_b')),
+                               'unit': 'hour', 'label': context_label(text, start), 'position': start})
+        elif kind == 'tier':
+            candidates.append({'kind': 'capacity_tier',
+                               'amount': int(match.group('tier_count') or match.group('tier_count_b')),
+                               'unit': 'person',
+                               'label': (match.group('tier_label') or match.group('tier_label_b')).lower(),
+                               'position': start})
+        else:
+            stated = match.group('cap_a') or match.group('cap_b')
+            candidates.append({'kind': 'capacity' if stated else 'people_mention',
+                               'amount': int(stated or match.group('cap_c')),
+                               'unit': 'person', 'label': context_label(text, start), 'position': start})
+    return candidates
+
+
+def hourly_score(candidate, text_length):
+    """How likely a price candidate is the listing's hourly rate, None if it can't be"""
+    low, high = HOURLY_RANGE
+    if candidate['kind'] != 'price' or candidate['unit'] not in ('hour', None) or not low <= candidate['amount'] <= high:
+        return None
+    score = 4.0 if candidate['unit'] == 'hour' else 1.0
+    if RATE_LABEL_PATTERN.search(candidate['label']):
+        score += 1.0
+    # The headline rate sits near the top of the page, ahead of fees and reviews
+    return score + 0.5 * (1 - candidate['position'] / max(text_length, 1))
+
+
+def extract_pricing(text, candidates=None):
+    """Structured pricing from page text: hourly rate, minimum hours, other rates, fees and capacity tiers"""
+    text = text or ''
+    candidates = price_candidates(text) if candidates is None else candidates
+    pricing = {'price_per_hour': None, 'min_hours': None, 'rates': [], 'fees': [],
+               'capacity': None, 'capacity_tiers': {}}
+
+    best_score = None
+    seen_rates = set()
+    for candidate in candidates:
+        kind = candidate['kind']
+        if kind == 'price':
+            score = hourly_score(candidate, len(text))
+            if score is not None and (best_score is None or score > best_score):
+                best_score, pricing['price_per_hour'] = score, candidate['amount']
+            rate_key = (candidate['amount'], candidate['unit'], candidate['label'])
+            if candidate['unit'] and rate_key not in seen_rates:
+                seen_rates.add(rate_key)
+                pricing['rates'].append({key: candidate[key] for key in ('amount', 'unit', 'label')})
+        elif kind == 'fee':
+            pricing['fees'].append({key: candidate[key] for key in ('amount', 'unit', 'label')})
+        elif kind == 'min_hours':
+            if pricing['min_hours'] is None and 1 <= candidate['amount'] <= 24:
+                pricing['min_hours'] = candidate['amount']
+        elif kind == 'capacity_tier':
+            tiers = pricing['capacity_tiers']
+            tiers[candidate['label']] = max(tiers.get(candidate['label'], 0), candidate['amount'])
+
+    # Stated capacity beats the largest tier, which beats any "N guests" mention (reviews say that too)
+    low, high = CAPACITY_RANGE
+    for kind in ('capacity', 'capacity_tier', 'people_mention'):
+        amounts = [c['amount'] for c in candidates if c['kind'] == kind and low <= c['amount'] <= high]
+        if amounts:
+            pricing['capacity'] = amounts[0] if kind == 'people_mention' else max(amounts)
+            break
+    return pricing
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract structured pricing from listing page text")
+    parser.add_argument('files', nargs='*', help="text files (default: stdin)")
+    parser.add_argument('--archive', default=None, help="run over every archived page in a page archive instead")
+    parser.add_argument('--candidates', action='store_true', help="also print every ranked candidate")
+    args = parser.parse_args()
+
+    if args.archive:
+        from listing_parser import ListingPageParser
+        from page_archive import PageArchive
+
+        archive = PageArchive(args.archive)
+        started = time.perf_counter()
+        count = characters = 0
+        for (listing_id, fetched_at), bundle in archive.fetches(kinds=('html', 'text')).items():
+            row = bundle.get('text') or bundle.get('html')
+            text = archive.read(row['segment'], row['offset'], row['length']).decode('utf-8')
+            if row['kind'] == 'html':
+                text = ListingPageParser(text).body_text()
+            characters += len(text)
+            count += 1
+            print(json.dumps(dict(extract_pricing(text), listing_id=listing_id, fetched_at=fetched_at)))
+        archive.close()
+        elapsed = time.perf_counter() - started
+        print(f"💰 {count} pages ({characters / 1e6:.1f}M chars) in {elapsed:.2f}s", file=sys.stderr)
+    else:
+        texts = [open(path).read() for path in args.files] if args.files else [sys.stdin.read()]
+        for text in texts:
+            candidates = price_candidates(text)
+            result = extract_pricing(text, candidates)
+            if args.candidates:
+                result['candidates'] = candidates
+            print(json.dumps(result, indent=2))
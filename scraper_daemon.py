@@ -0,0 +1,295 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from crawl_pool import browser_scraper_kwargs, load_scraper_class, scrape_with_restart
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8790  # fixture_server.py takes 8765
+
+
+class BrowserSession(threading.Thread):
+    """One warm scraper/browser owned by its own thread
+
+    The scraper is created, used and closed on this thread only (its SQLite
+    stores are per-thread). While idle it health-checks the browser and
+    restarts it if it stopped answering; after max_pages listings or
+    max_age seconds the browser is recycled right away, so the next request
+    still finds a warm one.
+    """
+
+    def __init__(self, session_id, jobs, scraper_kwargs, max_pages=200, max_age=3600, health_interval=30):
+        super().__init__(name=f"browser-session-{session_id}", daemon=True)
+        self.session_id = session_id
+        self.jobs = jobs
+        self.scraper_kwargs = scraper_kwargs
+        self.max_pages = max_pages
+        self.max_age = max_age
+        self.health_interval = health_interval
+        self.scraper = None
+        self.pages = 0
+        self.started_at = None
+        self.last_check = 0
+        self.busy = False
+        self.restarts = 0
+        self.stopping = threading.Event()
+
+    def start_browser(self):
+        """(Re)start the browser; the stealth setup is paid here, not per request"""
+        self.scraper.quit_driver()
+        self.pages = 0
+        self.started_at = time.time()
+        self.last_check = time.time()
+        if self.scraper.setup_driver():
+            return True
+        print(f"❌ Session {self.session_id} could not start a browser, retrying at the next check")
+        return False
+
+    def health_check(self):
+        self.last_check = time.time()
+        if self.scraper.driver is None or not self.scraper.driver_alive():
+            print(f"💥 Session {self.session_id} browser not answering, restarting")
+            self.restarts += 1
+            self.start_browser()
+
+    def scrape(self, url):
+        started = time.perf_counter()
+        data, error, restarted = scrape_with_restart(self.scraper, url, self.start_browser)
+        self.restarts += restarted
+        self.pages += 1
+        return {
+            'url': url,
+            'session': self.session_id,
+            'seconds': round(time.perf_counter() - started, 3),
+            'data': data,
+            'error': error,
+        }
+
+    def run(self):
+        self.scraper = load_scraper_class()(**self.scraper_kwargs)
+        self.start_browser()
+        try:
+            while not self.stopping.is_set():
+                try:
+                    url, future = self.jobs.get(timeout=1)
+                except queue.Empty:
+                    if time.time() - self.last_check >= self.health_interval:
+                        self.health_check()
+                    continue
+
+                if not future.set_running_or_notify_cancel():
+                    continue  # Client went away before we got to it
+                self.busy = True
+                try:
+                    future.set_result(self.scrape(url))
+                except Exception as e:
+                    future.set_exception(e)
+                finally:
+                    self.busy = False
+
+                if self.pages >= self.max_pages or time.time() - self.started_at >= self.max_age:
+                    print(f"♻️ Session {self.session_id} recycling its browser after {self.pages} listings")
+                    self.start_browser()
+                    self.last_check = time.time()
+        finally:
+            self.scraper.close()
+
+    def status(self):
+        return {
+            'session': self.session_id,
+            'alive': self.scraper is not None and self.scraper.driver is not None,
+            'busy': self.busy,
+            'pages': self.pages,
+            'age': round(time.time() - self.started_at, 1) if self.started_at else None,
+            'restarts': self.restarts,
+        }
+
+
+class ScraperDaemon:
+    """Long-lived pool of warm browser sessions behind a small local HTTP API
+
+    POST /scrape {"url": ...} or {"urls": [...]} streams one JSON result line
+    per listing as it finishes; GET /health reports every session; POST
+    /shutdown stops the daemon.
+    """
+
+    def __init__(self, sessions=1, host=DEFAULT_HOST, port=DEFAULT_PORT, max_pages=200, max_age=3600,
+                 health_interval=30, **scraper_kwargs):
+        self.host = host
+        self.port = port
+        self.jobs = queue.Queue()
+        scraper_kwargs = dict({'headless': True}, **scraper_kwargs)
+        self.sessions = [BrowserSession(i, self.jobs, browser_scraper_kwargs(scraper_kwargs, f"session-{i}"),
+                                        max_pages, max_age, health_interval)
+                         for i in range(sessions)]
+        self.httpd = None
+        self.started_at = None
+
+    def submit(self, url):
+        future = Future()
+        self.jobs.put((url, future))
+        return future
+
+    def health(self):
+        return {
+            'uptime': round(time.time() - self.started_at, 1),
+            'queued': self.jobs.qsize(),
+            'sessions': [session.status() for session in self.sessions],
+        }
+
+    def serve_forever(self):
+        for session in self.sessions:
+            session.start()
+        self.started_at = time.time()
+        self.httpd = ThreadingHTTPServer((self.host, self.port), make_handler(self))
+        print(f"🔥 Scraper daemon on http://{self.host}:{self.httpd.server_address[1]} "
+              f"with {len(self.sessions)} warm session(s)")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+            self.stop_sessions()
+
+    def stop_sessions(self):
+        for session in self.sessions:
+            session.stopping.set()
+        for session in self.sessions:
+            session.join(timeout=30)
+
+    def shutdown(self):
+        # serve_forever's own thread can't call shutdown() without deadlocking
+        threading.Thread(target=self.httpd.shutdown, daemon=True).start()
+
+
+def make_handler(daemon):
+    class DaemonHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, payload, status=200):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self.send_json(daemon.health())
+            else:
+                self.send_json({'error': 'not found'}, 404)
+
+        def do_POST(self):
+            if self.path == '/shutdown':
+                self.send_json({'ok': True})
+                daemon.shutdown()
+                return
+            if self.path != '/scrape':
+                self.send_json({'error': 'not found'}, 404)
+                return
+
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                urls = request.get('urls') or [request['url']]
+            except (ValueError, KeyError) as e:
+                self.send_json({'error': f"expected {{'url': ...}} or {{'urls': [...]}}: {e}"}, 400)
+                return
+
+            # Results stream back as JSON lines in completion order, the connection closes at the end
+            futures = [daemon.submit(url) for url in urls]
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            pending = set(futures)
+            try:
+                while pending:
+                    for future in [future for future in pending if future.done()]:
+                        pending.discard(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            result = {'url': urls[futures.index(future)], 'data': None, 'error': str(e)}
+                        self.wfile.write((json.dumps(result) + '\n').encode('utf-8'))
+                        self.wfile.flush()
+                    if pending:
+                        time.sleep(0.05)
+            except (BrokenPipeError, ConnectionResetError):
+                for future in pending:
+                    future.cancel()  # Sessions skip work nobody is waiting for
+
+    return DaemonHandler
+
+
+def daemon_url(host=DEFAULT_HOST, port=DEFAULT_PORT, path=''):
+    return f"http://{host}:{port}{path}"
+
+
+def daemon_health(host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=1):
+    """The daemon's /health payload, None if no daemon is listening"""
+    try:
+        response = requests.get(daemon_url(host, port, '/health'), timeout=timeout)
+        return response.json() if response.status_code == 200 else None
+    except requests.RequestException:
+        return None
+
+
+def scrape_via_daemon(urls, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=600):
+    """Yield result dicts from a running daemon as each listing finishes"""
+    if isinstance(urls, str):
+        urls = [urls]
+    response = requests.post(daemon_url(host, port, '/scrape'), json={'urls': list(urls)},
+                             stream=True, timeout=timeout)
+    response.raise_for_status()
+    with response:
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep warm browser sessions running and scrape through them")
+    parser.add_argument('command', choices=['serve', 'scrape', 'health', 'stop'])
+    parser.add_argument('urls', nargs='*', help="listing URLs for scrape")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--sessions', type=int, default=1, help="warm browsers to keep")
+    parser.add_argument('--max-pages', type=int, default=200, help="recycle a browser after this many listings")
+    parser.add_argument('--max-age', type=float, default=3600, help="recycle a browser after this many seconds")
+    parser.add_argument('--health-interval', type=float, default=30)
+    parser.add_argument('--http', action='store_true', help="try the browserless fast path first")
+    parser.add_argument('--lean', action='store_true', help="block images, media, fonts and trackers")
+    parser.add_argument('--store', default=None, help="listing store used to skip unchanged pages")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        ScraperDaemon(args.sessions, args.host, args.port, args.max_pages, args.max_age, args.health_interval,
+                      use_http=args.http, lean=args.lean, listing_store_path=args.store).serve_forever()
+    elif args.command == 'health':
+        health = daemon_health(args.host, args.port)
+        if health is None:
+            print(f"❌ No daemon on {daemon_url(args.host, args.port)}")
+            sys.exit(1)
+        print(json.dumps(health, indent=2))
+    elif args.command == 'stop':
+        try:
+            requests.post(daemon_url(args.host, args.port, '/shutdown'), timeout=5)
+            print("🛑 Daemon stopping")
+        except requests.RequestException:
+            print(f"❌ No daemon on {daemon_url(args.host, args.port)}")
+    else:
+        if not args.urls:
+            parser.error("scrape needs at least one URL")
+        for result in scrape_via_daemon(args.urls, args.host, args.port):
+            print(json.dumps(result))
+            status = '✅' if result['data'] else '❌'
+            print(f"{status} {result['url']} ({result.get('seconds')}s, session {result.get('session')})",
+                  file=sys.stderr)
@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# A selector that misses this many times in a row drops behind the others
+DEMOTE_AFTER = 3
+
+# A lock file older than this was left by a worker that died mid-save
+STALE_LOCK_SECONDS = 10
+
+# Path segments that identify one listing rather than the page layout
+ID_SEGMENT_PATTERN = re.compile(r'^(?:[0-9a-f]{16,}|\d+|[0-9a-f-]{32,36})$', re.IGNORECASE)
+
+
+def page_template(url, source=None):
+    """Layout key for a page: host plus path with id segments wildcarded
+
+    https://www.peerspace.com/pages/listings/5f1c... -> www.peerspace.com/pages/listings/*
+    A source ('http' for raw HTML) keeps parses of differently built markup apart:
+    www.peerspace.com/pages/listings/*#http
+    """
+    parsed = urlparse(url or '')
+    segments = [
+        '*' if ID_SEGMENT_PATTERN.match(segment) else segment
+        for segment in parsed.path.strip('/').split('/') if segment
+    ]
+    template = '/'.join([parsed.netloc] + segments)
+    return f"{template}#{source}" if source else template
+
+
+class SelectorCache:
+    """Remember which selector last matched each field, per page template
+
+    order() puts the last winner first and demotes selectors that keep
+    missing, so a page built from a known template usually needs one lookup
+    per field. Catch-all selectors in `fallback` (bare 'p', 'li', ...) match
+    almost any page, so they keep their place at the back even when they won.
+    record() keeps hit/miss counts for every selector tried; save() merges
+    them into what other processes saved meanwhile.
+    """
+
+    def __init__(self, path='selector_cache.json', demote_after=DEMOTE_AFTER, fallback=()):
+        self.path = path
+        self.demote_after = demote_after
+        self.fallback = frozenset(fallback)
+        self.entries = self.load()  # template -> field -> {'last': selector, 'stats': {selector: counts}}
+        self.pending = {}  # Same shape, only what this process recorded since the last save
+        self.dirty = False
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except ValueError:
+            return {}  # A half-written cache is only a hint, start over
+
+    @staticmethod
+    def entry(entries, template, field):
+        return entries.setdefault(template, {}).setdefault(field, {'last': None, 'stats': {}})
+
+    def order(self, template, field, selectors):
+        """Selectors to try: last winner, then the rest in order, repeated misses last"""
+        entry = self.entries.get(template, {}).get(field)
+        if not entry:
+            return list(selectors)
+
+        stats = entry['stats']
+
+        def rank(item):
+            index, selector = item
+            if selector == entry['last'] and selector not in self.fallback:
+                return 0, index
+            demoted = stats.get(selector, {}).get('streak', 0) >= self.demote_after
+            return (2 if demoted else 1), index
+
+        return [selector for _, selector in sorted(enumerate(selectors), key=rank)]
+
+    def record(self, template, field, tried, winner):
+        """Count a miss for every selector in `tried` except the winner (None if all missed)"""
+        for entries in (self.entries, self.pending):
+            entry = self.entry(entries, template, field)
+            stats = entry['stats']
+            for selector in tried:
+                counts = stats.setdefault(selector, {'hits': 0, 'misses': 0, 'streak': 0})
+                if selector == winner:
+                    counts['hits'] += 1
+                    counts['streak'] = 0
+                else:
+                    counts['misses'] += 1
+                    counts['streak'] += 1
+            if winner is not None:
+                entry['last'] = winner
+        self.dirty = True
+
+    def summary(self):
+        """Per template/field: winning selector and the share of selector lookups that matched"""
+        rows = []
+        for template, fields in sorted(self.entries.items()):
+            for field, entry in sorted(fields.items()):
+                stats = entry['stats']
+                hits = sum(counts['hits'] for counts in stats.values())
+                misses = sum(counts['misses'] for counts in stats.values())
+                lookups = hits + misses
+                rows.append({
+                    'template': template, 'field': field, 'last': entry['last'],
+                    'hits': hits, 'misses': misses,
+                    'hit_rate': round(hits / lookups, 3) if lookups else None,
+                })
+        return rows
+
+    @contextmanager
+    def locked(self):
+        """Hold the cache's lock file, so concurrent savers merge one after another"""
+        lock_path = f"{self.path}.lock"
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue  # Released (or cleared) between the two calls
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(lock_path)
+
+    def save(self):
+        """Merge this process's counts into the saved cache; crawl workers all save the same file"""
+        if not self.dirty or not self.path:
+            return
+        with self.locked():
+            entries = self.load()
+            for template, fields in self.pending.items():
+                for field, recorded in fields.items():
+                    entry = self.entry(entries, template, field)
+                    for selector, counts in recorded['stats'].items():
+                        merged = entry['stats'].setdefault(selector, {'hits': 0, 'misses': 0, 'streak': 0})
+                        merged['hits'] += counts['hits']
+                        merged['misses'] += counts['misses']
+                        merged['streak'] = self.entries[template][field]['stats'][selector]['streak']
+                    if recorded['last'] is not None:
+                        entry['last'] = recorded['last']
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        self.entries = entries
+        self.pending = {}
+        self.dirty = False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show which selectors are winning per page template")
+    parser.add_argument('path', nargs='?', default='selector_cache.json')
+    args = parser.parse_args()
+
+    for row in SelectorCache(args.path).summary():
+        rate = '-' if row['hit_rate'] is None else f"{row['hit_rate']:.0%}"
+        print(f"{row['template']:<40} {row['field']:<12} {rate:>5}  "
+              f"({row['hits']} hits, {row['misses']} misses)  {row['last']}")
@@ -0,0 +1,215 @@
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+# Column name -> dtype for one row per (listing, crawl time)
+COLUMNS = {
+    'listing': np.int32,       # Code into the listings dictionary
+    'crawled_at': np.float64,  # Unix time
+    'price_per_hour': np.float32,  # NaN when missing
+    'capacity': np.int32,      # -1 when missing
+    'category': np.int32,      # Code into the categories dictionary, -1 when missing
+    'photo_count': np.int32,
+}
+
+MISSING_TEXT = ('', 'Not found', None)
+
+
+class SnapshotWriter:
+    """Append-only columnar snapshots written as compressed row groups
+
+    Each flush writes rg-<n>.npz (np.savez_compressed) holding one array per
+    column plus an amenity bit matrix. Strings (listing ids, categories,
+    amenities) are dictionary-encoded in dictionaries.json. Single writer only.
+    """
+
+    def __init__(self, root='snapshots', row_group_size=50000):
+        self.root = root
+        self.row_group_size = row_group_size
+        os.makedirs(root, exist_ok=True)
+        self.dictionaries = load_dictionaries(root)
+        self.codes = {name: {value: i for i, value in enumerate(values)}
+                      for name, values in self.dictionaries.items()}
+        self.rows = []
+
+    def code(self, name, value):
+        codes = self.codes[name]
+        if value not in codes:
+            codes[value] = len(self.dictionaries[name])
+            self.dictionaries[name].append(value)
+        return codes[value]
+
+    def append(self, listing_id, venue_data, crawled_at=None):
+        """Buffer one snapshot row, flushing when the row group is full"""
+        price = venue_data.get('price_per_hour')
+        capacity = venue_data.get('capacity')
+        category = venue_data.get('category')
+        self.rows.append((
+            self.code('listings', listing_id),
+            crawled_at or time.time(),
+            np.nan if price is None else float(price),
+            -1 if capacity is None else int(capacity),
+            -1 if category in MISSING_TEXT else self.code('categories', category),
+            int(venue_data.get('photo_count') or len(venue_data.get('photos') or [])),
+            [self.code('amenities', amenity) for amenity in venue_data.get('amenities') or []],
+        ))
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows as the next compressed row group"""
+        if not self.rows:
+            return None
+
+        arrays = {name: np.array([row[i] for row in self.rows], dtype=dtype)
+                  for i, (name, dtype) in enumerate(COLUMNS.items())}
+
+        # Amenity flags as a bit matrix, one uint64 word per 64 amenities
+        words = max(1, (len(self.dictionaries['amenities']) + 63) // 64)
+        bits = np.zeros((len(self.rows), words), dtype=np.uint64)
+        for r, row in enumerate(self.rows):
+            for code in row[-1]:
+                bits[r, code // 64] |= np.uint64(1) << np.uint64(code % 64)
+        arrays['amenity_bits'] = bits
+
+        # Dictionaries first, so a row group never references unknown codes
+        save_dictionaries(self.root, self.dictionaries)
+        number = next_row_group_number(self.root)
+        path = os.path.join(self.root, f"rg-{number:06d}.npz")
+        temp_path = os.path.join(self.root, f".tmp-rg-{number:06d}.npz")  # Outside the rg-*.npz glob
+        np.savez_compressed(temp_path, **arrays)
+        os.replace(temp_path, path)
+
+        self.rows = []
+        return path
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_dictionaries(root):
+    path = os.path.join(root, 'dictionaries.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'listings': [], 'categories': [], 'amenities': []}
+
+
+def save_dictionaries(root, dictionaries):
+    path = os.path.join(root, 'dictionaries.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(dictionaries, f)
+    os.replace(path + '.tmp', path)
+
+
+def row_group_paths(root):
+    return sorted(glob.glob(os.path.join(root, 'rg-*.npz')))
+
+
+def next_row_group_number(root):
+    paths = row_group_paths(root)
+    if not paths:
+        return 1
+    return int(os.path.basename(paths[-1])[3:9]) + 1
+
+
+class SnapshotTable:
+    """Memory-mapped snapshot columns plus the string dictionaries"""
+
+    def __init__(self, columns, dictionaries):
+        self.columns = columns
+        self.dictionaries = dictionaries
+
+    def __len__(self):
+        return len(self.columns['crawled_at'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def listing_ids(self):
+        """Listing id string per row (decoded lazily, this one allocates)"""
+        return np.asarray(self.dictionaries['listings'], dtype=object)[self.columns['listing']]
+
+    def amenity_matrix(self):
+        """(rows, amenities) bool matrix unpacked from the bit words"""
+        bits = np.ascontiguousarray(self.columns['amenity_bits'])
+        unpacked = np.unpackbits(bits.view(np.uint8), axis=1, bitorder='little').astype(bool)
+        return unpacked[:, :len(self.dictionaries['amenities'])]
+
+
+def read_manifest(cache_dir):
+    """{'row_groups': [names], 'rows': n} the column cache was built from, None if there is none"""
+    path = os.path.join(cache_dir, 'manifest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    return manifest if isinstance(manifest, dict) else None  # Older caches kept a bare list, rebuild those
+
+
+def build_column_cache(root, cache_dir, paths):
+    """Bring the uncompressed .npy per column up to date with the row groups
+
+    When the cache holds a prefix of the row groups (the writer only appends),
+    only the new row groups are decompressed and appended; otherwise all are.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    names = [os.path.basename(path) for path in paths]
+    column_names = list(COLUMNS) + ['amenity_bits']
+
+    cached = {}
+    manifest = read_manifest(cache_dir)
+    if manifest and names[:len(manifest['row_groups'])] == manifest['row_groups']:
+        try:
+            cached = {name: np.load(os.path.join(cache_dir, name + '.npy')) for name in column_names}
+        except OSError:
+            cached = {}
+        if any(len(column) != manifest['rows'] for column in cached.values()):
+            cached = {}  # A build died half way, start over
+    groups = [np.load(path) for path in paths[len(manifest['row_groups']) if cached else 0:]]
+    bit_parts = [group['amenity_bits'] for group in groups] + ([cached['amenity_bits']] if cached else [])
+    words = max([part.shape[1] for part in bit_parts] or [1])
+
+    rows = 0
+    for name, dtype in list(COLUMNS.items()) + [('amenity_bits', np.uint64)]:
+        parts = ([cached[name]] if cached else []) + [group[name] for group in groups]
+        if name == 'amenity_bits':
+            # Older row groups were written when fewer amenities were known
+            parts = [np.pad(part, ((0, 0), (0, words - part.shape[1]))) for part in parts]
+        if parts:
+            column = np.concatenate(parts)
+        else:
+            column = np.empty((0, words) if name == 'amenity_bits' else 0, dtype=dtype)
+        temp_path = os.path.join(cache_dir, f".tmp-{name}.npy")
+        np.save(temp_path, column)
+        os.replace(temp_path, os.path.join(cache_dir, name + '.npy'))
+        rows = len(column)
+
+    with open(os.path.join(cache_dir, 'manifest.json'), 'w') as f:
+        json.dump({'row_groups': names, 'rows': rows}, f)
+
+
+def load_snapshots(root='snapshots'):
+    """Open all snapshots as memory-mapped columns
+
+    The first load after new row groups are appended adds them to the
+    uncompressed column cache; later loads just memory-map it.
+    """
+    cache_dir = os.path.join(root, 'cache')
+    paths = row_group_paths(root)
+    manifest = read_manifest(cache_dir)
+    if manifest is None or manifest['row_groups'] != [os.path.basename(path) for path in paths]:
+        build_column_cache(root, cache_dir, paths)
+
+    columns = {name: np.load(os.path.join(cache_dir, name + '.npy'), mmap_mode='r')
+               for name in list(COLUMNS) + ['amenity_bits']}
+    return SnapshotTable(columns, load_dictionaries(root))
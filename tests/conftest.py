@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scraper modules are flat files at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,90 @@
+import multiprocessing as mp
+import os
+
+import pytest
+
+import crawl_pool
+from crawl_pool import CrawlPool
+
+pytestmark = pytest.mark.skipif(mp.get_start_method() != 'fork',
+                                reason="workers see the patched scraper only when forked")
+
+
+class FakeScraper:
+    """Scraper stand-in; a URL ending in /die kills the worker process outright"""
+
+    driver = None
+
+    def __init__(self, **kwargs):
+        pass
+
+    def scrape_single_listing(self, url):
+        if url.endswith('/die'):
+            os._exit(3)
+        return {'url': url}
+
+    def driver_alive(self):
+        return True
+
+    def quit_driver(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_dead_worker_loses_only_its_own_url(monkeypatch):
+    monkeypatch.setattr(crawl_pool, 'load_scraper_class', lambda: FakeScraper)
+    urls = [f'http://example.com/listings/{n}' for n in range(6)]
+    urls.insert(3, 'http://example.com/listings/die')
+
+    results = {result['url']: result for result in CrawlPool(workers=2, per_host_rate=1000).crawl(urls)}
+
+    assert sorted(results) == sorted(urls)
+    assert results['http://example.com/listings/die']['error'] == 'worker exited with code 3'
+    assert all(results[url]['data'] == {'url': url} for url in urls if not url.endswith('/die'))
+
+
+def test_feed_error_reaches_the_consumer(monkeypatch):
+    monkeypatch.setattr(crawl_pool, 'load_scraper_class', lambda: FakeScraper)
+
+    def listings():
+        yield 'http://example.com/listings/1'
+        raise FileNotFoundError('missing.txt')
+
+    with pytest.raises(FileNotFoundError):
+        list(CrawlPool(workers=2, per_host_rate=1000).crawl(listings()))
+
+
+class CrashingScraper(FakeScraper):
+    """Browser that dies on the first listing and works once restarted"""
+
+    def __init__(self, **kwargs):
+        self.driver = 'chrome'
+        self.alive = True
+        self.calls = 0
+
+    def scrape_single_listing(self, url):
+        self.calls += 1
+        if self.calls == 1:
+            self.alive = False
+            raise RuntimeError('tab crashed')
+        return {'url': url}
+
+    def driver_alive(self):
+        return self.alive
+
+    def restart(self):
+        self.alive = True
+
+
+def test_scrape_with_restart_retries_once_after_a_crash():
+    scraper = CrashingScraper()
+    data, error, restarted = crawl_pool.scrape_with_restart(scraper, 'http://example.com/1', scraper.restart)
+    assert (data, error, restarted) == ({'url': 'http://example.com/1'}, None, True)
+
+
+def test_lean_browsers_get_their_own_cache():
+    kwargs = {'lean': True, 'browser_cache_dir': 'cache'}
+    assert crawl_pool.browser_scraper_kwargs(kwargs, 'session-1')['browser_cache_dir'] == os.path.join('cache', 'session-1')
+    assert crawl_pool.browser_scraper_kwargs({'lean': False}, 'session-1') == {'lean': False}
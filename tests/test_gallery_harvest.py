@@ -0,0 +1,24 @@
+from gallery_harvest import network_photo_urls
+from listing_parser import is_venue_photo_url
+
+CDN = 'https://cdn.example.com'
+KNOWN = [f'{CDN}/listings/123/01.jpg', f'{CDN}/listings/123/02.jpg']
+
+
+def test_network_photos_only_from_listing_directory():
+    resources = [
+        {'src': f'{CDN}/listings/123/03.jpg', 'bytes': 120000},
+        {'src': f'{CDN}/listings/456/01.jpg', 'bytes': 120000},  # Another listing's card
+        {'src': f'{CDN}/static/hero.jpg', 'bytes': 300000},
+        {'src': f'{CDN}/listings/123/logo.png', 'bytes': 90000},
+        {'src': f'{CDN}/listings/123/04.jpg', 'bytes': 900},      # Thumbnail
+        {'src': f'{CDN}/listings/123/05.jpg', 'bytes': 0},        # Size hidden by the CDN
+    ]
+    assert network_photo_urls(resources, KNOWN, is_venue_photo_url) == [
+        f'{CDN}/listings/123/03.jpg', f'{CDN}/listings/123/05.jpg']
+
+
+def test_network_photos_need_a_listing_directory():
+    resources = [{'src': f'{CDN}/other.jpg', 'bytes': 120000}]
+    assert network_photo_urls(resources, [f'{CDN}/photo.jpg'], is_venue_photo_url) == []
+    assert network_photo_urls(resources, [], is_venue_photo_url) == []
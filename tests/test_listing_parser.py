@@ -0,0 +1,60 @@
+import requests
+
+from fixture_server import FixtureServer, SyntheticSite, SyntheticSiteServer
+from listing_parser import ListingPageParser, parse_listing_html
+
+
+def test_sample_listing_fields():
+    with FixtureServer() as server:
+        url = server.url('sample_listing.html')
+        venue = parse_listing_html(requests.get(url, timeout=10).text, url)
+
+    assert venue['name'] == 'Sunlit Loft with Skyline Views'
+    assert venue['price_per_hour'] == 85
+    assert venue['capacity'] == 40
+    assert 'Los Angeles' in venue['address']
+    assert venue['category'] == 'Loft'
+    assert venue['host_name'] == 'Maria G.'
+    assert venue['description'].startswith('A bright industrial loft')
+    assert venue['amenities'] == ['Wi-Fi', 'Tables', 'Chairs', 'Natural light', 'Restrooms']
+    assert venue['photos'] == [f'https://images.example-cdn.com/listings/loft_0{n}.jpg?w=800' for n in (1, 2, 3)]
+    assert venue['pricing']['min_hours'] == 2
+
+
+def test_synthetic_listing_gallery_modal():
+    site = SyntheticSite(photo_count=12)
+    with SyntheticSiteServer(site) as server:
+        listing_id = site.listing_ids()[0]
+        url = server.url(f'/pages/listings/{listing_id}')
+        venue = parse_listing_html(requests.get(url, timeout=10).text, url)
+
+    (name, price, capacity, amenities, _, _), _ = site.listing_facts(listing_id)
+    assert (venue['name'], venue['price_per_hour'], venue['capacity']) == (name, price, capacity)
+    assert venue['amenities'] == amenities
+    assert venue['photos'] == [server.url(f'/photos/{listing_id}/{n:02d}.png') for n in range(1, 13)]
+
+
+BREADCRUMB_PAGE = """<html><head>
+<script type="application/ld+json">{"@context": "https://schema.org", "@type": "BreadcrumbList", "itemListElement": [
+  {"@type": "ListItem", "position": 1, "item": {"@id": "https://example.com/la", "name": "Los Angeles"}}]}</script>
+<script id="__NEXT_DATA__" type="application/json">{"props": {"pageProps": {
+  "site": {"title": "Peerspace", "description": "Book unique venues for meetings, events and shoots anywhere"},
+  "listing": {"id": "abc123", "hourlyRate": 90, "location": {"lat": 34.05, "lng": -118.25}}}}}</script>
+</head><body><h1>Garden Studio</h1><div class="location-text">Echo Park, Los Angeles, CA</div>
+<div data-testid="listing-description"><p>A leafy garden studio with skylights, a kitchenette and room for forty guests.</p></div>
+</body></html>"""
+
+
+def test_blob_fields_come_from_the_listing_node():
+    venue = parse_listing_html(BREADCRUMB_PAGE, 'https://example.com/pages/listings/abc123')
+    assert venue['name'] == 'Garden Studio'
+    assert venue['description'].startswith('A leafy garden studio')
+    assert venue['price_per_hour'] == 90
+    assert (venue['latitude'], venue['longitude']) == (34.05, -118.25)
+
+
+def test_snapshot_parses_html_only_when_extracting():
+    parser = ListingPageParser('<html><body><h1>Garden Studio</h1></body></html>', body_text='Garden Studio')
+    assert parser.body_text() == 'Garden Studio'
+    assert parser._soup is None
+    assert parser.find_text_by_multiple_selectors(['h1']) == 'Garden Studio'
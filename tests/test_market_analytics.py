@@ -0,0 +1,12 @@
+from market_analytics import build_feature_matrix, drop_duplicates
+
+
+def test_records_dedupe_by_listing_id():
+    records = [
+        {'url': f'https://www.peerspace.com/pages/listings/{listing_id}', 'price_per_hour': price,
+         'capacity': 20, 'category': 'Loft', 'amenities': ['Wi-Fi']}
+        for listing_id, price in (('aaa', 100), ('bbb', 110), ('ccc', 90))
+    ]
+    features = build_feature_matrix(records)
+    assert features.ids == ['aaa', 'bbb', 'ccc']
+    assert drop_duplicates(features, [['aaa', 'bbb']]).ids == ['aaa', 'ccc']
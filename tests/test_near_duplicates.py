@@ -0,0 +1,24 @@
+from near_duplicates import DuplicateFinder, bucket_pairs
+
+TEXT = "Sunny loft with big windows and exposed brick in the arts district downtown"
+
+
+def test_bucket_pairs_empty():
+    assert bucket_pairs([]).shape == (0, 2)
+
+
+def test_finder_without_photos():
+    finder = DuplicateFinder()
+    finder.add('a', TEXT, [])
+    finder.add('b', TEXT, [])
+    finder.add('c', "Backyard garden with a pool and string lights for parties", [])
+    pairs = finder.find()
+    assert [(pair['a'], pair['b']) for pair in pairs] == [('a', 'b')]
+    assert pairs[0]['shared_photos'] == 0
+
+
+def test_finder_without_text_or_photos():
+    finder = DuplicateFinder()
+    finder.add('a', '', [])
+    finder.add('b', '', [])
+    assert finder.find() == []
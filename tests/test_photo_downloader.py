@@ -0,0 +1,58 @@
+from photo_downloader import PhotoDownloader
+
+URL = 'https://cdn.example.com/listings/123/01.jpg'
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakeSession:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.headers_sent = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.headers_sent.append(headers)
+        return FakeResponse(self.statuses.pop(0))
+
+    def close(self):
+        pass
+
+
+class VanishedStore:
+    """Store that handed out validators for an object it no longer has"""
+
+    def conditional_headers(self, url):
+        return {'If-None-Match': '"abc"'}
+
+    def lookup(self, url):
+        return None
+
+    def put_stream(self, url, response, chunk_size):
+        return {'content_hash': 'abc', 'bytes': 10, 'path': '/objects/abc'}
+
+
+def test_304_for_vanished_object_refetches_without_a_retry():
+    session = FakeSession([304, 200])
+    downloader = PhotoDownloader(retries=0, session=session, store=VanishedStore())
+    result = downloader.fetch(URL, None)
+    assert result['status'] == 200 and result['error'] is None
+    assert result['attempts'] == 1
+    assert session.headers_sent == [{'If-None-Match': '"abc"'}, {}]
+
+
+def test_unconditional_304_is_an_error():
+    session = FakeSession([304, 304])
+    downloader = PhotoDownloader(retries=3, session=session, store=VanishedStore())
+    result = downloader.fetch(URL, None)
+    assert result['error'] == 'Status 304'
+    assert len(session.headers_sent) == 2
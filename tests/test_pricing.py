@@ -0,0 +1,23 @@
+import pytest
+
+from pricing import extract_pricing
+
+
+@pytest.mark.parametrize('text, price, fees', [
+    ("$150/hr\nCleaning fee $50", 150, [50]),
+    ("$150/hr\nSecurity deposit\n$200", 150, [200]),
+    ("Cleaning fee: $150\n$75 per hour", 75, [150]),
+    ("$120/hr cleaning fee included\nCapacity: 40", None, [120]),
+    ("Starting at $95/hour\n2 hr minimum\nUp to 60 people", 95, []),
+])
+def test_rate_next_to_fee_lines(text, price, fees):
+    pricing = extract_pricing(text)
+    assert pricing['price_per_hour'] == price
+    assert [fee['amount'] for fee in pricing['fees']] == fees
+
+
+def test_minimum_and_capacity_tiers():
+    pricing = extract_pricing("$85/hr\n2 hr minimum\nSeated: 40\nStanding: 80\nReviews: great for 20 guests")
+    assert pricing['min_hours'] == 2
+    assert pricing['capacity_tiers'] == {'seated': 40, 'standing': 80}
+    assert pricing['capacity'] == 80
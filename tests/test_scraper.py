@@ -0,0 +1,58 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from crawl_pool import load_scraper_class
+
+
+class BrokenDaemonHandler(BaseHTTPRequestHandler):
+    """Answers /health but fails every scrape"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = json.dumps({'sessions': []}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.send_response(503)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def test_failing_daemon_falls_back_to_local_scrape():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), BrokenDaemonHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        scraper = load_scraper_class()(daemon_port=httpd.server_address[1], selector_cache_path=None,
+                                       page_archive_dir=None)
+        assert scraper.scrape_with_daemon('https://example.com/pages/listings/abc123') is None
+        scraper.close()
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+class SnapshotDriver:
+    """Answers the one snapshot script with a fixed page"""
+
+    def __init__(self, html):
+        self.html = html
+
+    def execute_script(self, script, *args):
+        return {'html': self.html, 'text': ''}
+
+
+def test_browser_snapshot_finds_listing_coordinates():
+    html = ('<script id="__NEXT_DATA__" type="application/json">{"props": {"listing": '
+            '{"id": "abc123", "location": {"lat": 34.05, "lng": -118.25}}}}</script><h1>Garden Studio</h1>')
+    scraper = load_scraper_class()(selector_cache_path=None, page_archive_dir=None)
+    scraper.driver = SnapshotDriver(html)
+    scraper.listing_id = 'abc123'
+    assert scraper.get_snapshot().coordinates() == (34.05, -118.25)
+    scraper.driver = None
+    scraper.close()
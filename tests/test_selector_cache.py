@@ -0,0 +1,32 @@
+from selector_cache import SelectorCache, page_template
+
+TEMPLATE = 'www.example.com/listings/*'
+SELECTORS = ['.description', '.about', 'p']
+
+
+def test_page_template_source():
+    url = 'https://www.example.com/listings/5f1c0a9b8c7d6e5f4a3b2c1d'
+    assert page_template(url) == TEMPLATE
+    assert page_template(url, 'http') == TEMPLATE + '#http'
+
+
+def test_fallback_winner_is_not_promoted():
+    cache = SelectorCache(None, fallback=['p'])
+    cache.record(TEMPLATE, 'description', SELECTORS, 'p')
+    assert cache.order(TEMPLATE, 'description', SELECTORS) == SELECTORS
+    cache.record(TEMPLATE, 'description', SELECTORS, '.about')
+    assert cache.order(TEMPLATE, 'description', SELECTORS) == ['.about', '.description', 'p']
+
+
+def test_save_merges_concurrent_writers(tmp_path):
+    path = str(tmp_path / 'selector_cache.json')
+    first, second = SelectorCache(path), SelectorCache(path)
+    first.record(TEMPLATE, 'description', ['.description'], '.description')
+    second.record(TEMPLATE, 'description', ['.description', '.about'], '.about')
+    first.save()
+    second.save()
+
+    stats = SelectorCache(path).entries[TEMPLATE]['description']['stats']
+    assert stats['.description'] == {'hits': 1, 'misses': 1, 'streak': 1}
+    assert stats['.about']['hits'] == 1
+    assert not (tmp_path / 'selector_cache.json.lock').exists()
@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+
+import snapshot_columns
+from snapshot_columns import SnapshotWriter, load_snapshots, row_group_paths
+
+
+def write_group(root, rows, amenities):
+    with SnapshotWriter(root) as writer:
+        for listing_id, price in rows:
+            writer.append(listing_id, {'price_per_hour': price, 'amenities': amenities}, crawled_at=1.0)
+
+
+def test_temp_row_group_is_outside_the_glob(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    seen = []
+    original = np.savez_compressed
+
+    def savez_compressed(path, **arrays):
+        seen.append(row_group_paths(root))
+        original(path, **arrays)
+        seen.append(row_group_paths(root))
+
+    monkeypatch.setattr(snapshot_columns.np, 'savez_compressed', savez_compressed)
+    write_group(root, [('a', 10)], [])
+    assert seen == [[], []]
+    assert [os.path.basename(path) for path in row_group_paths(root)] == ['rg-000001.npz']
+
+
+def test_column_cache_appends_new_row_groups(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    write_group(root, [('a', 10), ('b', 20)], ['Wi-Fi'])
+    assert len(load_snapshots(root)) == 2
+
+    # More amenities than fit the first group's bit words
+    write_group(root, [('c', 30)], [f'amenity {i}' for i in range(70)])
+    loaded = []
+    original = np.load
+    monkeypatch.setattr(snapshot_columns.np, 'load',
+                        lambda path, **kwargs: loaded.append(os.path.basename(path)) or original(path, **kwargs))
+    table = load_snapshots(root)
+
+    assert 'rg-000001.npz' not in loaded
+    assert table['price_per_hour'].tolist() == [10, 20, 30]
+    assert table.amenity_matrix().shape == (3, 71)
+    assert table.amenity_matrix()[:, 0].tolist() == [True, True, False]
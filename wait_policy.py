@@ -0,0 +1,135 @@
+import json
+import time
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from instrumentation import DISABLED
+
+# Seconds to wait for each step's readiness condition before moving on anyway
+DEFAULT_TIMEOUTS = {
+    'page_ready': 15,
+    'button_clickable': 3,
+    'gallery_open': 8,
+    'images_stable': 6,
+}
+
+PAGE_READY_SELECTOR = 'h1, [data-testid*="title"], .listing-title, .space-title'
+
+
+class page_content_present:
+    """Document is parsed and the listing title or enough body text is there"""
+
+    def __init__(self, selector=PAGE_READY_SELECTOR, min_text_length=200):
+        self.selector = selector
+        self.min_text_length = min_text_length
+
+    def __call__(self, driver):
+        return driver.execute_script(
+            "if (document.readyState === 'loading' || !document.body) return false;"
+            "if (document.querySelector(arguments[0])) return true;"
+            "return document.body.innerText.length >= arguments[1];",
+            self.selector, self.min_text_length
+        )
+
+
+class image_count_stable:
+    """Number of loaded images under a selector stopped changing for a few polls
+
+    With loaded_only=False images are counted once they have a src, for
+    browsers that block image downloads.
+    """
+
+    def __init__(self, selector, stable_polls=3, loaded_only=True):
+        self.selector = selector
+        self.stable_polls = stable_polls
+        self.loaded_only = loaded_only
+        self.last_count = None
+        self.same_count = 0
+
+    def __call__(self, driver):
+        count = driver.execute_script(
+            "return Array.from(document.querySelectorAll(arguments[0]))"
+            ".filter(img => arguments[1] ? (img.complete && img.naturalWidth > 0) : !!img.src).length;",
+            self.selector, self.loaded_only
+        )
+        if count and count == self.last_count:
+            self.same_count += 1
+        else:
+            self.same_count = 0
+        self.last_count = count
+        return count if self.same_count >= self.stable_polls else False
+
+
+class WaitPolicy:
+    """Central wait policy: every scraper step waits on a readiness condition and gets timed"""
+
+    def __init__(self, timeouts=None, poll_frequency=0.1, instrumentation=DISABLED):
+        self.instrumentation = instrumentation
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.poll_frequency = poll_frequency
+        self.records = []
+
+    def record(self, step, started, ok):
+        elapsed = time.perf_counter() - started
+        self.records.append({'step': step, 'seconds': round(elapsed, 4), 'ok': ok})
+        return elapsed
+
+    def wait_for(self, driver, step, condition, timeout=None):
+        """Wait until condition(driver) is truthy, return its value or None on timeout"""
+        timeout = self.timeouts.get(step, 10) if timeout is None else timeout
+        started = time.perf_counter()
+        with self.instrumentation.span(f"wait.{step}") as span:
+            try:
+                result = WebDriverWait(
+                    driver, timeout, poll_frequency=self.poll_frequency,
+                    ignored_exceptions=(WebDriverException,)
+                ).until(condition)
+                self.record(step, started, True)
+                return result
+            except TimeoutException:
+                self.record(step, started, False)
+                span.set(timed_out=True)
+                print(f"⏱️ Wait for '{step}' timed out after {timeout}s, continuing")
+                return None
+
+    def page_ready(self, driver):
+        return self.wait_for(driver, 'page_ready', page_content_present())
+
+    def button_clickable(self, driver, element):
+        return self.wait_for(driver, 'button_clickable', EC.element_to_be_clickable(element))
+
+    def gallery_open(self, driver, modal_selectors, visible=True):
+        # Blocked images have no size, so they never count as visible
+        locator = (By.CSS_SELECTOR, ', '.join(modal_selectors))
+        condition = EC.visibility_of_any_elements_located if visible else EC.presence_of_element_located
+        return self.wait_for(driver, 'gallery_open', condition(locator))
+
+    def images_stable(self, driver, selector, loaded_only=True):
+        return self.wait_for(driver, 'images_stable', image_count_stable(selector, loaded_only=loaded_only))
+
+    def summary(self):
+        """Per-step count, mean, max and timeout totals"""
+        steps = {}
+        for record in self.records:
+            stats = steps.setdefault(record['step'], {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+            stats['count'] += 1
+            stats['total'] += record['seconds']
+            stats['max'] = max(stats['max'], record['seconds'])
+            if not record['ok']:
+                stats['timeouts'] += 1
+
+        for stats in steps.values():
+            stats['mean'] = round(stats['total'] / stats['count'], 4)
+            stats['total'] = round(stats['total'], 4)
+        return steps
+
+    def print_summary(self):
+        for step, stats in self.summary().items():
+            print(f"⏱️ {step}: {stats['count']}x, mean {stats['mean']}s, max {stats['max']}s, timeouts {stats['timeouts']}")
+
+    def save(self, path):
+        """Write raw wait records so timeouts can be tuned offline"""
+        with open(path, 'w') as f:
+            json.dump({'timeouts': self.timeouts, 'records': self.records, 'summary': self.summary()}, f, indent=2)